@@ -0,0 +1,213 @@
+"""
+Global admission control for browser scrapes.
+
+Caps how many Chrome sessions run at once on this host. Slots are lock files
+held with flock, so the cap also holds across gunicorn workers. Inside one
+process, waiting jobs form a priority queue: first-login scrapes (a new user
+staring at an empty dashboard) go before user-initiated refreshes, which go
+before background maintenance. Within a class the order is FIFO, and a
+waiter moves up one class for every ADMISSION_AGING_SECONDS it has waited so
+background work is never starved. Per-class limits keep lower classes from
+filling every slot. Only the first waiter allowed to run competes for a
+slot, and every waiter can report its position ("queued #4") instead of
+starting another Chrome and getting the box OOM-killed.
+"""
+import os
+import time
+import logging
+import tempfile
+import threading
+import itertools
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: fall back to an in-process cap
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ====== Admission Configuration ======
+MAX_BROWSER_SESSIONS = int(os.getenv("MAX_BROWSER_SESSIONS", "2"))
+ADMISSION_LOCK_DIR = os.getenv("ADMISSION_LOCK_DIR", tempfile.gettempdir())
+ADMISSION_POLL_INTERVAL = 0.5
+ADMISSION_AGING_SECONDS = float(os.getenv("ADMISSION_AGING_SECONDS", "30"))
+
+# Priority classes, most urgent first
+FIRST_LOGIN, USER, BACKGROUND = "first_login", "user", "background"
+PRIORITY_CLASSES = (FIRST_LOGIN, USER, BACKGROUND)
+
+
+def parse_class_limits(value, slots):
+    """Per-class slot limits from "background=1,user=2"; unspecified classes may use every slot"""
+    limits = {FIRST_LOGIN: slots, USER: slots, BACKGROUND: max(1, slots - 1)}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, limit = item.partition("=")
+        if name.strip() in limits and limit.strip().isdigit():
+            limits[name.strip()] = max(1, int(limit))
+        else:
+            logger.warning(f"⚠️ Ignoring invalid ADMISSION_CLASS_LIMITS entry: {item}")
+    return limits
+
+
+class Waiter:
+    """One job waiting for a browser slot"""
+    def __init__(self, seq, priority):
+        self.seq = seq
+        self.priority = priority
+        self.enqueued_at = time.time()
+
+    def current_class(self):
+        # A callable lets a coalesced, more urgent request promote a job that is already queued
+        return self.priority() if callable(self.priority) else self.priority
+
+    def rank(self, now):
+        aged = int((now - self.enqueued_at) // ADMISSION_AGING_SECONDS) if ADMISSION_AGING_SECONDS > 0 else 0
+        return (max(0, PRIORITY_CLASSES.index(self.current_class()) - aged), self.seq)
+
+
+class BrowserSlot:
+    """One held browser slot (an flock'd file, or an in-process counter entry)"""
+    def __init__(self, index, handle=None, priority=USER):
+        self.index = index
+        self.handle = handle
+        self.priority = priority
+        self.acquired_at = time.time()
+
+
+class AdmissionController:
+    """Priority queue in front of a host-wide cap on concurrent browser sessions"""
+    def __init__(self, slots=MAX_BROWSER_SESSIONS, lock_dir=ADMISSION_LOCK_DIR, class_limits=None):
+        self.slots = max(1, slots)
+        self.lock_dir = lock_dir
+        self.class_limits = class_limits or parse_class_limits(os.getenv("ADMISSION_CLASS_LIMITS", ""), self.slots)
+        self.waiting = []
+        self.held = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {
+            name: {"admitted": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            for name in PRIORITY_CLASSES
+        }
+
+    def _lock_path(self, index):
+        return os.path.join(self.lock_dir, f"academia_browser_slot_{index}.lock")
+
+    def _try_take_slot(self, priority):
+        """Grab any free slot without blocking; caller holds self._cond"""
+        for index in range(self.slots):
+            if index in self.held:
+                continue
+            if fcntl is None:
+                slot = BrowserSlot(index, priority=priority)
+            else:
+                handle = open(self._lock_path(index), "w")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    handle.close()
+                    continue
+                slot = BrowserSlot(index, handle, priority)
+            self.held[index] = slot
+            return slot
+        return None
+
+    def _in_use(self, priority):
+        return sum(1 for slot in self.held.values() if slot.priority == priority)
+
+    def _queue(self):
+        """Waiters in the order they will be served; caller holds self._cond"""
+        now = time.time()
+        return sorted(self.waiting, key=lambda waiter: waiter.rank(now))
+
+    def _next_eligible(self, queue):
+        """First waiter whose class is under its limit; only it competes for a slot"""
+        for waiter in queue:
+            priority = waiter.current_class()
+            if self._in_use(priority) < self.class_limits[priority]:
+                return waiter
+        return None
+
+    def acquire(self, priority=USER, on_position=None):
+        """
+        Wait in line for a browser slot. priority is a class name, or a callable returning one
+        (re-read while waiting). on_position(n) is called whenever the queue position changes.
+        """
+        waiter = Waiter(next(self._seq), priority)
+        last_position = None
+        with self._cond:
+            self.waiting.append(waiter)
+        try:
+            while True:
+                with self._cond:
+                    queue = self._queue()
+                    position = queue.index(waiter) + 1
+                    if self._next_eligible(queue) is waiter:
+                        slot = self._try_take_slot(waiter.current_class())
+                        if slot:
+                            self.waiting.remove(waiter)
+                            self._record_wait(slot.priority, time.time() - waiter.enqueued_at)
+                            self._cond.notify_all()
+                            return slot
+                if position != last_position:
+                    last_position = position
+                    logger.info(f"Waiting for a browser slot ({waiter.current_class()}): queued #{position}")
+                    if on_position:
+                        on_position(position)
+                with self._cond:
+                    # Slots freed by other gunicorn workers don't notify us, and aging reorders the
+                    # queue without any event, so poll as well
+                    self._cond.wait(ADMISSION_POLL_INTERVAL)
+        except BaseException:
+            with self._cond:
+                if waiter in self.waiting:
+                    self.waiting.remove(waiter)
+                    self._cond.notify_all()
+            raise
+
+    def release(self, slot):
+        with self._cond:
+            if slot.handle:
+                try:
+                    fcntl.flock(slot.handle, fcntl.LOCK_UN)
+                finally:
+                    slot.handle.close()
+            self.held.pop(slot.index, None)
+            self._cond.notify_all()
+
+    def _record_wait(self, priority, seconds):
+        stats = self.stats[priority]
+        stats["admitted"] += 1
+        stats["total_wait_seconds"] += seconds
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], seconds)
+
+    @contextmanager
+    def admitted(self, priority=USER, on_position=None):
+        slot = self.acquire(priority, on_position)
+        try:
+            yield slot
+        finally:
+            self.release(slot)
+
+    def get_stats(self):
+        with self._cond:
+            classes = {}
+            for name, stats in self.stats.items():
+                classes[name] = dict(
+                    stats,
+                    total_wait_seconds=round(stats["total_wait_seconds"], 2),
+                    max_wait_seconds=round(stats["max_wait_seconds"], 2),
+                    limit=self.class_limits[name],
+                    in_use=self._in_use(name),
+                    queued=sum(1 for waiter in self.waiting if waiter.current_class() == name)
+                )
+            return {
+                "slots": self.slots,
+                "in_use": len(self.held),
+                "queued": len(self.waiting),
+                "aging_seconds": ADMISSION_AGING_SECONDS,
+                "classes": classes
+            }
+
+
+admission = AdmissionController()
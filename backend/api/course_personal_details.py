@@ -11,6 +11,11 @@ import base64
 import logging
 import requests
 from bs4 import BeautifulSoup
+try:
+    from html_parsing import make_soup
+except ImportError:  # Run from backend/api, where the backend modules are not importable
+    def make_soup(html):
+        return BeautifulSoup(html, "html.parser")
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -201,7 +206,7 @@ def parse_timetable_html(html_content):
         dict: Dictionary containing personal details and course details
     """
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = make_soup(html_content)
         
         # Initialize the result structure
         result = {
@@ -0,0 +1,217 @@
+"""
+Asyncio scraping engine for attendance refreshes.
+
+One event loop, running in a background thread, drives the browserless HTTP
+path for every user: aiohttp for the portal (login and page fetches), with a
+bounded semaphore so only ASYNC_MAX_INFLIGHT portal requests are ever in
+flight. Parsing and saving a fetched page run in the scrape worker processes
+(scrape_workers.run_page_save), waited on from a PAGE_SAVE_THREADS executor of
+their own so a burst of saves can't starve the default executor; the remaining
+blocking Supabase calls are pushed to threads with asyncio.to_thread. Hundreds
+of refreshes can be queued at once;
+concurrency is limited by what the portal tolerates rather than by threads
+or Chrome instances.
+
+Users whose refresh needs a real browser come back with needs_browser set,
+and the caller falls back to the Selenium scraper. A password the portal
+rejects comes back with credentials_rejected set instead: a browser would
+only send it again.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_scraper import PAGE_URL, ATTENDANCE_PAGE_NAME, HEADERS, SessionExpired, decode_page_payload, looks_like_login_page
+from scrape_workers import run_page_save
+from portal_auth import (SIGNIN_URL, BASE_URL, HEADERS as LOGIN_HEADERS, InteractionRequired, InvalidCredentials,
+                         signin_payload, check_signin_response, record_login_outcome)
+
+logger = logging.getLogger(__name__)
+
+# ====== Async Engine Configuration ======
+ASYNC_ENGINE_ENABLED = os.getenv("ASYNC_ENGINE_ENABLED", "true").lower() == "true"
+ASYNC_MAX_INFLIGHT = int(os.getenv("ASYNC_MAX_INFLIGHT", "8"))
+ASYNC_REQUEST_TIMEOUT = float(os.getenv("ASYNC_REQUEST_TIMEOUT", "20"))
+PAGE_SAVE_THREADS = int(os.getenv("PAGE_SAVE_THREADS", "4"))
+
+
+class AsyncScrapeEngine:
+    """Refreshes many users concurrently on one event loop over the HTTP scraping path"""
+    def __init__(self, max_inflight=ASYNC_MAX_INFLIGHT):
+        self.max_inflight = max_inflight
+        self.loop = None
+        self.session = None
+        self.semaphore = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.page_save_executor = ThreadPoolExecutor(max_workers=PAGE_SAVE_THREADS, thread_name_prefix="page-save")
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "needs_browser": 0,
+            "credentials_rejected": 0,
+            "failed": 0,
+            "inflight_requests": 0,
+            "peak_inflight_requests": 0,
+            "max_inflight": max_inflight
+        }
+
+    def start(self):
+        """Start the event loop thread on first use"""
+        with self._lock:
+            if self.loop:
+                return self
+            import aiohttp  # noqa: F401 - fail here, not inside the loop, when aiohttp is missing
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self.loop.run_forever, name="async-scrape-engine", daemon=True)
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+            logger.info(f"✅ Async scrape engine started ({self.max_inflight} portal requests in flight max)")
+            return self
+
+    async def _open(self):
+        import aiohttp
+        self.semaphore = asyncio.Semaphore(self.max_inflight)
+        # Cookies are passed per request; a shared jar would mix users' sessions
+        self.session = aiohttp.ClientSession(
+            headers=HEADERS,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=aiohttp.ClientTimeout(total=ASYNC_REQUEST_TIMEOUT)
+        )
+
+    def submit(self, email, password):
+        """Queue one user's attendance refresh; returns a concurrent.futures.Future with the result"""
+        self.start()
+        self.stats["submitted"] += 1
+        return asyncio.run_coroutine_threadsafe(self.refresh_user(email, password), self.loop)
+
+    def refresh_many(self, users):
+        """Refresh a list of (email, password) pairs concurrently and wait for all results"""
+        self.start()
+        self.stats["submitted"] += len(users)
+        future = asyncio.run_coroutine_threadsafe(self.refresh_users(users), self.loop)
+        return future.result()
+
+    async def refresh_users(self, users):
+        results = await asyncio.gather(*(self.refresh_user(email, password) for email, password in users))
+        return dict(zip((email for email, _ in users), results))
+
+    async def _portal_request(self, session, method, url, **kwargs):
+        """One portal request under the in-flight limit; returns (status, final url, body)"""
+        async with self.semaphore:
+            self.stats["inflight_requests"] += 1
+            self.stats["peak_inflight_requests"] = max(self.stats["peak_inflight_requests"], self.stats["inflight_requests"])
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    return response.status, str(response.url), await response.text()
+            finally:
+                self.stats["inflight_requests"] -= 1
+
+    async def login(self, email, password):
+        """
+        signin.ac login on a throwaway cookie jar; returns {name: value} or None when a
+        browser is needed. Raises InvalidCredentials when the portal rejects the password.
+        """
+        import aiohttp
+        started = time.time()
+        jar = aiohttp.CookieJar()
+        async with aiohttp.ClientSession(connector=self.session.connector, connector_owner=False,
+                                         cookie_jar=jar, timeout=self.session.timeout) as session:
+            try:
+                status, _, body = await self._portal_request(
+                    session, "POST", SIGNIN_URL, data=signin_payload(email, password), headers=LOGIN_HEADERS
+                )
+                if status >= 400:
+                    raise InteractionRequired(f"signin.ac returned HTTP {status}")
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise InteractionRequired("signin.ac did not return JSON")
+                check_signin_response(data)
+                # Visit the portal once so the app-level session cookies are issued too
+                await self._portal_request(session, "GET", BASE_URL, headers=LOGIN_HEADERS)
+            except InvalidCredentials as e:
+                logger.error(f"❌ Async HTTP login for {email} rejected credentials: {e}")
+                record_login_outcome("http", False, time.time() - started)
+                raise
+            except InteractionRequired as e:
+                logger.info(f"Async HTTP login for {email} needs a browser: {e}")
+                record_login_outcome("http", False, time.time() - started)
+                return None
+            except Exception as e:
+                logger.warning(f"⚠️ Async HTTP login for {email} failed: {e}")
+                record_login_outcome("http", False, time.time() - started)
+                return None
+        cookies = {cookie.key: cookie.value for cookie in jar}
+        record_login_outcome("http", bool(cookies), time.time() - started)
+        return cookies or None
+
+    async def fetch_page(self, cookies, page_name):
+        """Fetch and decode an Academia page payload, or raise SessionExpired"""
+        status, url, body = await self._portal_request(self.session, "GET", PAGE_URL.format(page=page_name), cookies=cookies)
+        if looks_like_login_page(status, url, body):
+            raise SessionExpired(f"{page_name} returned the login page (HTTP {status})")
+        if status >= 400:
+            raise Exception(f"{page_name} returned HTTP {status}")
+        return decode_page_payload(body)
+
+    async def refresh_user(self, email, password):
+        """Refresh one user's attendance and marks without a browser"""
+        import srm_scrapper
+        started = time.time()
+        scraper = srm_scrapper.SRMScraper(email, password)
+        try:
+            stored = await asyncio.to_thread(scraper.load_stored_session)
+            cookies = stored["cookies"] if stored else None
+            html_source, fresh = None, False
+            while html_source is None:
+                if not cookies:
+                    if fresh or not password:
+                        return self._finish(email, started, None)
+                    cookies, fresh = await self.login(email, password), True
+                    if not cookies:
+                        return self._finish(email, started, None)
+                    await asyncio.to_thread(scraper.store_session_cookies, cookies)
+                try:
+                    html_source = await self.fetch_page(cookies, ATTENDANCE_PAGE_NAME)
+                except SessionExpired as e:
+                    logger.info(f"Async engine session expired for {email}: {e}")
+                    cookies = None
+
+            # Parsing and the Supabase writes are heavy; run them in a scrape worker, off the API process
+            result = await asyncio.get_running_loop().run_in_executor(
+                self.page_save_executor, run_page_save, email, password, html_source
+            )
+            return self._finish(email, started, result)
+        except InvalidCredentials:
+            self.stats["credentials_rejected"] += 1
+            return dict(scraper.credentials_error(), engine="async", seconds=round(time.time() - started, 2))
+        except Exception as e:
+            logger.error(f"❌ Async refresh failed for {email}: {e}")
+            self.stats["failed"] += 1
+            return {"status": "error", "message": str(e), "engine": "async"}
+
+    def _finish(self, email, started, result):
+        elapsed = round(time.time() - started, 2)
+        if result is None:
+            self.stats["needs_browser"] += 1
+            logger.info(f"Async refresh for {email} needs a browser ({elapsed}s)")
+            return {"status": "error", "needs_browser": True, "engine": "async", "seconds": elapsed}
+        if result.get("status") != "success":
+            # The scrape worker reports its failures as results rather than raising
+            self.stats["failed"] += 1
+            logger.error(f"❌ Async refresh failed for {email}: {result.get('message')}")
+            return dict(result, engine="async", seconds=elapsed)
+        self.stats["completed"] += 1
+        logger.info(f"✅ Async refresh for {email} finished in {elapsed}s")
+        return dict(result, engine="async", seconds=elapsed)
+
+    def get_stats(self):
+        return dict(self.stats, running=self.loop is not None)
+
+
+engine = AsyncScrapeEngine()
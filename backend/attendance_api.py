@@ -8,6 +8,11 @@ from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from scrape_workers import run_scrape_job, SCRAPE_WORKERS
+from scrape_jobs import JobRegistry
+from admission import admission, FIRST_LOGIN, BACKGROUND
+from background_refresh import BackgroundRefresher, BACKGROUND_REFRESH_ENABLED, mark_user_seen
+from freshness import load_fresh_datasets, claim_forced_refresh, timetable_refresh_reason, seconds_since, last_confirmed_at
 
 # Load environment variables
 load_dotenv()
@@ -21,73 +26,150 @@ app = Flask(__name__)
 # Enable CORS for all routes with proper configuration
 CORS(app, origins=["https://academia-khaki.vercel.app", "http://localhost:3000"], supports_credentials=True, allow_headers=["Content-Type", "Authorization"])
 
-active_scrapers = {}
+jobs = JobRegistry()
 
-def async_scraper(email, password):
-    """Run scraper in background."""
+def prewarm_driver_pool():
+    """Launch the warm Chrome pool at boot so the first scrape skips Chrome's cold start."""
+    import srm_scrapper
+    srm_scrapper.driver_pool.warm()
+
+# With worker processes, each worker warms its own pool
+if os.getenv("DRIVER_POOL_PREWARM", "false").lower() == "true" and SCRAPE_WORKERS <= 0:
+    prewarm_driver_pool()
+
+def run_admitted_scrape(job, email, password, scraper_type, http_first=True):
+    """Wait in the browser admission queue at the job's priority (reporting the position on the job), then run the scrape."""
+    with admission.admitted(priority=lambda: job.priority,
+                            on_position=lambda position: jobs.set_queue_position(job, position)):
+        jobs.start(job, phase="scraping")
+        return run_scrape_job(email, password, scraper_type=scraper_type, http_first=http_first)
+
+def async_scraper(job, email, password, http_first=True):
+    """Run scraper in background; http_first=False when the async engine's HTTP attempt already failed."""
     try:
-        print(f"Starting attendance scraper for {email}")
-        # Import here to avoid circular imports
-        # This is the correct import statement for srm_scrapper
-        import srm_scrapper
-        
+        print(f"Starting attendance scraper for {email} (job {job.id})")
         # Use the "attendance" type to only run attendance & marks scraper
-        success = srm_scrapper.run_scraper(email, password, scraper_type="attendance")
+        result = run_admitted_scrape(job, email, password, "attendance", http_first=http_first)
+        success = result.get("status") == "success"
         print(f"Attendance scraper finished for {email} with success: {success}")
-        
-        active_scrapers[email] = {
-            "status": "completed" if success else "failed",
-            "updated_at": datetime.utcnow().isoformat()
-        }
+        jobs.finish(job, success, error=None if success else result.get("message"), changes=result.get("changes"))
+        if success:
+            refresh_timetable_if_stale(email, password)
     except Exception as e:
         print(f"Attendance scraper error for {email}: {e}")
         import traceback
         traceback.print_exc()
-        active_scrapers[email] = {"status": "failed", "error": str(e)}
+        jobs.finish(job, False, error=str(e))
 
-def delayed_timetable_scraper(email, password, delay_seconds=1):
-    """Run timetable scraper in background with a delay to avoid resource conflicts."""
-    time.sleep(delay_seconds)  # Wait before starting to avoid two Chrome instances at once
-    active_scrapers[f"timetable_{email}"] = {"status": "waiting"}
-    
+def start_attendance_refresh(job, email, password):
+    """Refresh attendance and marks on the shared async engine; fall back to a Selenium thread when it can't."""
+    engine = None
     try:
-        # Import here to avoid circular imports
-        import srm_scrapper
-        print(f"Starting timetable scraper for {email} after {delay_seconds}s delay")
-        active_scrapers[f"timetable_{email}"] = {"status": "running"}
+        from async_engine import engine as async_engine, ASYNC_ENGINE_ENABLED
+        if ASYNC_ENGINE_ENABLED:
+            engine = async_engine.start()
+    except Exception as e:
+        print(f"Async engine unavailable, using a scraper thread: {e}")
+    if engine is None:
+        threading.Thread(target=async_scraper, args=(job, email, password), daemon=True).start()
+        return
+
+    def on_done(future):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        if result.get("status") == "success":
+            print(f"Async refresh finished for {email} in {result.get('seconds')}s")
+            jobs.finish(job, True, engine="async", changes=result.get("changes"))
+            # Runs on the engine's event loop; keep the Supabase reads off it
+            threading.Thread(target=refresh_timetable_if_stale, args=(email, password), daemon=True).start()
+        elif result.get("credentials_rejected"):
+            # A browser login would send the rejected password again
+            jobs.finish(job, False, error=result.get("message"))
+        elif not password:
+            # Same stored cookies the engine just tried, and nothing to log in with
+            jobs.finish(job, False, error="Stored session expired; log in again to refresh")
+        else:
+            print(f"Async refresh for {email} needs the browser scraper: {result.get('message', 'no HTTP session')}")
+            jobs.set_phase(job, "browser_fallback")
+            # The engine just tried the HTTP path; go straight to the browser
+            threading.Thread(target=async_scraper, args=(job, email, password, False), daemon=True).start()
+
+    jobs.start(job, phase="http")
+    engine.submit(email, password).add_done_callback(on_done)
+
+def timetable_scraper(job, email, password):
+    """Run timetable scraper in background; admission control keeps Chrome sessions within the host's limit."""
+    try:
+        print(f"Starting timetable scraper for {email} (job {job.id})")
         # Use the "timetable" type to only run timetable scraper
-        success = srm_scrapper.run_scraper(email, password, scraper_type="timetable")
+        result = run_admitted_scrape(job, email, password, "timetable")
+        success = result.get("status") == "success"
         print(f"Timetable scraper finished for {email} with success: {success}")
-        active_scrapers[f"timetable_{email}"] = {
-            "status": "completed" if success else "failed"
-        }
+        if success:
+            jobs.finish_part(job, "timetable", True, result=result)
+        else:
+            jobs.finish(job, False, error=result.get("message"))
     except Exception as e:
         print(f"Timetable scraper error for {email}: {e}")
         import traceback
         traceback.print_exc()
-        active_scrapers[f"timetable_{email}"] = {"status": "failed", "error": str(e)}
+        jobs.finish(job, False, error=str(e))
 
-def unified_async_scraper(email, password):
-    """Run unified scraper in background to handle both attendance and timetable."""
+def refresh_timetable_if_stale(email, password):
+    """After an attendance refresh, queue a timetable scrape only if the course registration changed or the cached one expired."""
+    if not password:
+        return
     try:
-        print(f"Starting unified scraper for {email}")
-        # Initialize both statuses
-        active_scrapers[email] = {"status": "running"}
-        
-        # For refresh, we only need to run the attendance scraper (which includes marks)
-        # as timetable doesn't change frequently
-        threading.Thread(
-            target=async_scraper,
-            args=(email, password),
-            daemon=True
-        ).start()
-            
-        print(f"Refresh scraper started for {email}")
+        user_resp = supabase.table("users").select("id").eq("email", email).execute()
+        if not user_resp.data:
+            return
+        reason = timetable_refresh_reason(supabase, user_resp.data[0]["id"])
+    except Exception as e:
+        print(f"Could not check timetable freshness for {email}: {e}")
+        return
+    if reason:
+        print(f"Timetable for {email} needs a scrape ({reason})")
+        jobs.submit(email, "timetable", in_thread(timetable_scraper, email, password), priority=BACKGROUND)
+
+def first_login_scraper(job, email, password):
+    """Scrape attendance, marks and timetable for a new user with one Chrome and one login."""
+    try:
+        print(f"Starting unified first-login scraper for {email} (job {job.id})")
+        result = run_admitted_scrape(job, email, password, "unified")
+        print(f"Unified scraper finished for {email} with status: {result.get('status')}")
+
+        attendance_ok = result.get("attendance_success") or result.get("marks_success")
+        jobs.finish_part(job, "timetable", bool(result.get("timetable_success")), result=result.get("timetable_data"))
+        # Closes the attendance part with its own outcome
+        jobs.finish(job, bool(attendance_ok), error=None if attendance_ok else result.get("message"),
+                    phases=result.get("phases", {}), changes=result.get("changes"))
     except Exception as e:
-        print(f"Unified scraper error: {e}")
+        print(f"Unified scraper error for {email}: {e}")
         import traceback
-        traceback.print_exc()  # Print full traceback for debugging
-        active_scrapers[email] = {"status": "failed", "error": str(e)}
+        traceback.print_exc()
+        jobs.finish(job, False, error=str(e))
+
+def in_thread(target, *args):
+    """Job starter that runs target(job, *args) on a daemon thread."""
+    return lambda job: threading.Thread(target=target, args=(job,) + args, daemon=True).start()
+
+def unified_async_scraper(email, password):
+    """Queue an attendance & marks refresh, or attach to the one already in flight. Returns (job, created)."""
+    # For refresh, we only need to run the attendance scraper (which includes marks)
+    # as timetable doesn't change frequently
+    job, created = jobs.submit(email, "attendance", lambda job: start_attendance_refresh(job, email, password))
+    if created:
+        print(f"Refresh scraper started for {email} (job {job.id})")
+    return job, created
+
+def queue_background_refresh(email, password):
+    """Scheduler callback: a background-priority attendance refresh that yields to user requests."""
+    jobs.submit(email, "attendance", lambda job: start_attendance_refresh(job, email, password), priority=BACKGROUND)
+
+# One process per host leads; the others stand by in case it dies
+background_refresher = BackgroundRefresher(supabase, queue_background_refresh).start() if BACKGROUND_REFRESH_ENABLED else None
 
 @app.route("/health", methods=["GET"])
 def health_check():
@@ -97,6 +179,32 @@ def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
+@app.route("/api/scraper-metrics", methods=["GET"])
+def get_scraper_metrics():
+    try:
+        import srm_scrapper
+        from memory_watchdog import get_memory_metrics
+        from portal_auth import get_login_stats
+        from dom_extract import get_extraction_stats
+        from html_parsing import PARSER_BACKEND
+        from async_engine import engine
+        from scrape_workers import get_worker_pool
+        return jsonify({
+            "success": True,
+            "memory": get_memory_metrics(),
+            "driver_pool": srm_scrapper.driver_pool.get_stats(),
+            "sessions": srm_scrapper.session_lifetime_stats,
+            "logins": get_login_stats(),
+            "extraction": dict(get_extraction_stats(), parser_backend=PARSER_BACKEND),
+            "async_engine": engine.get_stats(),
+            "workers": get_worker_pool().get_stats() if SCRAPE_WORKERS > 0 else None,
+            "jobs": jobs.get_stats(),
+            "admission": admission.get_stats(),
+            "background_refresh": background_refresher.get_stats() if background_refresher else {"enabled": False}
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/login", methods=["POST", "OPTIONS"])
 def login_route():
     if request.method == "OPTIONS":
@@ -152,6 +260,8 @@ def login_route():
             print(f"Database error during user lookup/creation: {e}")
             return jsonify({"success": False, "error": "Database operation failed"}), 500
 
+        mark_user_seen(supabase, user["id"])
+
         # 4) Generate token with user["id"]
         token = jwt.encode({
             "email": email,
@@ -162,34 +272,19 @@ def login_route():
         # 5) First, check if user already has timetable data
         timetable_resp = supabase.table("timetable").select("*").eq("user_id", user["id"]).execute()
         if not timetable_resp.data or len(timetable_resp.data) == 0:
-            # If no timetable data exists, we need to run timetable scraper first
-            print(f"No timetable data found for {email}, starting timetable scraper first")
-            # Start timetable scraper first
-            threading.Thread(
-                target=delayed_timetable_scraper,
-                args=(email, password, 0),  # No delay for first run
-                daemon=True
-            ).start()
-            
-            # Then start attendance scraper with a delay
-            threading.Thread(
-                target=async_scraper,
-                args=(email, password),
-                daemon=True
-            ).start()
+            # If no timetable data exists, scrape everything in one browser session
+            print(f"No timetable data found for {email}, starting unified scraper")
+            job, _ = jobs.submit(email, "unified", in_thread(first_login_scraper, email, password), priority=FIRST_LOGIN)
         else:
             # If timetable data exists, just update attendance and marks
             print(f"Timetable data exists for {email}, updating attendance only")
-            threading.Thread(
-                target=async_scraper,
-                args=(email, password),
-                daemon=True
-            ).start()
+            job, _ = unified_async_scraper(email, password)
 
         return jsonify({
             "success": True,
             "token": token,
-            "user": {"email": email, "id": user["id"]}
+            "user": {"email": email, "id": user["id"]},
+            "job_id": job.id
         })
 
     except Exception as e:
@@ -209,6 +304,7 @@ def get_attendance():
         try:
             payload = jwt.decode(token, os.getenv('JWT_SECRET', 'default-secret-key'), algorithms=["HS256"])
             user_id = payload["id"]
+            mark_user_seen(supabase, user_id)
         except jwt.ExpiredSignatureError:
             return jsonify({"success": False, "error": "Token expired"}), 401
         except jwt.InvalidTokenError:
@@ -255,6 +351,7 @@ def get_marks():
         try:
             payload = jwt.decode(token, os.getenv('JWT_SECRET', 'default-secret-key'), algorithms=["HS256"])
             user_id = payload["id"]
+            mark_user_seen(supabase, user_id)
         except jwt.ExpiredSignatureError:
             return jsonify({"success": False, "error": "Token expired"}), 401
         except jwt.InvalidTokenError:
@@ -288,6 +385,7 @@ def get_user_timetable():
         try:
             payload = jwt.decode(token, os.getenv('JWT_SECRET', 'default-secret-key'), algorithms=["HS256"])
             user_id = payload["id"]
+            mark_user_seen(supabase, user_id)
             email = payload["email"]
         except jwt.ExpiredSignatureError:
             return jsonify({"success": False, "error": "Token expired"}), 401
@@ -320,10 +418,27 @@ def get_user_timetable():
             if not password:
                 return jsonify({"success": False, "error": "Password required for timetable access"}), 400
 
+            # Serve the stored timetable while the course registration is unchanged and it is within its TTL
+            force = str(data.get("force", request.args.get("force", ""))).lower() in ("1", "true", "yes")
+            latest = jobs.latest(email, "timetable")
+            if not force and not (latest and latest.active):
+                reason = timetable_refresh_reason(supabase, user_id)
+                if reason is None:
+                    tt_resp = supabase.table("timetable").select("*").eq("user_id", user_id).execute()
+                    timetable_data = tt_resp.data[0]
+                    return jsonify({
+                        "success": True,
+                        "status": "fresh",
+                        "timetable": timetable_data["timetable_data"],
+                        "batch": timetable_data["batch"],
+                        "personal_details": timetable_data["personal_details"]
+                    }), 200
+                print(f"Timetable for {email} needs a scrape ({reason})")
+
             # Check timetable scraper status
-            scraper_key = f"timetable_{email}"
-            if scraper_key in active_scrapers and active_scrapers[scraper_key]["status"] == "completed":
-                result = active_scrapers[scraper_key].get("result", {})
+            timetable_status = jobs.status(email, "timetable")
+            if timetable_status["status"] == "completed":
+                result = timetable_status.get("result") or {}
                 if result.get("status") == "success":
                     return jsonify({
                         "success": True,
@@ -332,25 +447,14 @@ def get_user_timetable():
                         "personal_details": result["personal_details"]
                     }), 200
             
-            # Start a new scraper if none is running or previous one failed
-            if scraper_key not in active_scrapers or active_scrapers[scraper_key]["status"] != "running":
-                active_scrapers[scraper_key] = {"status": "running"}
-                # Run in a separate thread to avoid blocking
-                threading.Thread(
-                    target=delayed_timetable_scraper,
-                    args=(email, password),
-                    daemon=True
-                ).start()
-                
-                return jsonify({
-                    "success": True,
-                    "message": "Timetable scraper started. Please check status endpoint."
-                }), 202
-            else:
-                return jsonify({
-                    "success": True,
-                    "message": "Timetable scraper already running. Please wait."
-                }), 202
+            # Start a new scraper unless one is already in flight (then attach to it)
+            job, created = jobs.submit(email, "timetable", in_thread(timetable_scraper, email, password))
+            return jsonify({
+                "success": True,
+                "message": "Timetable scraper started. Please check status endpoint." if created
+                           else "Timetable scraper already running. Please wait.",
+                "job_id": job.id
+            }), 202
 
     except Exception as e:
         print(f"Error in timetable endpoint: {e}")
@@ -374,8 +478,7 @@ def get_timetable_status():
         except jwt.InvalidTokenError:
             return jsonify({"success": False, "error": "Invalid token"}), 401
 
-        scraper_key = f"timetable_{email}"
-        status = active_scrapers.get(scraper_key, {"status": "not_started"})
+        status = jobs.status(email, "timetable")
         
         # If scraper completed, return the results too
         if status.get("status") == "completed" and "result" in status:
@@ -409,12 +512,36 @@ def get_scraper_status():
         except jwt.InvalidTokenError:
             return jsonify({"success": False, "error": "Invalid token"}), 401
 
-        status = active_scrapers.get(email, {"status": "not_started"})
+        status = jobs.status(email, "attendance")
         return jsonify({"success": True, "status": status})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/scrape-jobs/<job_id>", methods=["GET"])
+def get_scrape_job(job_id):
+    try:
+        auth_header = request.headers.get("Authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return jsonify({"success": False, "error": "No token provided"}), 401
+
+        token = auth_header.split(" ")[1]
+        try:
+            payload = jwt.decode(token, os.getenv('JWT_SECRET', 'default-secret-key'), algorithms=["HS256"])
+            email = payload["email"]
+        except jwt.ExpiredSignatureError:
+            return jsonify({"success": False, "error": "Token expired"}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({"success": False, "error": "Invalid token"}), 401
+
+        job = jobs.get(job_id)
+        if not job or job.email != email:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        return jsonify({"success": True, "job": job.to_dict()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route("/api/register", methods=["POST", "OPTIONS"])
 def register():
     if request.method == "OPTIONS":
@@ -474,38 +601,60 @@ def refresh_data():
             # Decode JWT token to get user information
             payload = jwt.decode(token, os.getenv('JWT_SECRET', 'default-secret-key'), algorithms=["HS256"])
             user_id = payload["id"]
+            mark_user_seen(supabase, user_id)
             email = payload["email"]
         except jwt.ExpiredSignatureError:
             return jsonify({"success": False, "error": "Token expired"}), 401
         except jwt.InvalidTokenError:
             return jsonify({"success": False, "error": "Invalid token"}), 401
-        
+
+        data = request.get_json(silent=True) or {}
+        force = str(data.get("force", request.args.get("force", ""))).lower() in ("1", "true", "yes")
+
+        # A refresh already in flight is attached to below; otherwise apply the freshness policy
+        latest = jobs.latest(email, "attendance")
+        if not (latest and latest.active):
+            if force:
+                retry_after = claim_forced_refresh(supabase, user_id)
+                if retry_after:
+                    return jsonify({
+                        "success": False,
+                        "error": "A refresh just ran; try again shortly",
+                        "status": "cooldown",
+                        "retry_after": retry_after
+                    }), 429
+            else:
+                fresh = load_fresh_datasets(supabase, user_id)
+                if fresh:
+                    # Recorded as a completed job so /api/refresh-status polling sees it finish
+                    job = jobs.record(email, "attendance", source="cache")
+                    return jsonify({
+                        "success": True,
+                        "message": "Data is already fresh",
+                        "status": "fresh",
+                        "attendance": fresh["attendance"]["data"],
+                        "marks": fresh["marks"]["data"],
+                        "age_seconds": max(entry["age_seconds"] for entry in fresh.values()),
+                        "job_id": job.id
+                    }), 200
+
         # Get password from database or request
         user_resp = supabase.table("users").select("*").eq("id", user_id).execute()
         if not user_resp.data:
             return jsonify({"success": False, "error": "User not found"}), 404
             
         # Get stored password or fetch from request
-        data = request.get_json() or {}
         password = data.get("password")
         
-        # Start the unified scraper in background
-        active_scrapers[email] = {"status": "running", "started_at": datetime.utcnow().isoformat()}
-        
-        # Update the timestamp in the attendance and marks tables
-        current_time = datetime.utcnow().isoformat()
-        
-        # Run the unified scraper in a background thread
-        threading.Thread(
-            target=unified_async_scraper,
-            args=(email, password if password else user_resp.data[0].get("password")),
-            daemon=True
-        ).start()
+        # Queue the refresh; it runs on the async engine (or a scraper thread) without blocking the request.
+        # A refresh already in flight for this user is reused instead of starting another
+        job, created = unified_async_scraper(email, password if password else user_resp.data[0].get("password"))
         
         return jsonify({
             "success": True,
-            "message": "Refresh process started",
-            "status": "running"
+            "message": "Refresh process started" if created else "Refresh already in progress",
+            "status": "running",
+            "job_id": job.id
         }), 202
         
     except Exception as e:
@@ -539,28 +688,45 @@ def check_refresh_status():
             return jsonify({"success": False, "error": "Invalid token"}), 401
         
         # Get attendance scraper status
-        status = active_scrapers.get(email, {"status": "not_started"})
+        status = jobs.status(email, "attendance")
+
+        # This worker may not know the job that served the data (another worker, or a restart):
+        # data a scrape confirmed after this worker's last outcome counts as a completed refresh
+        if status.get("status") in ("not_started", "failed"):
+            fresh = load_fresh_datasets(supabase, user_id)
+            if fresh:
+                data_age = max(entry["age_seconds"] for entry in fresh.values())
+                failed_age = seconds_since(status.get("updated_at"))
+                if failed_age is None or data_age < failed_age:
+                    status = {"status": "completed", "source": "cache"}
         
         # If completed, get the updated timestamps from the database
         if status.get("status") == "completed":
-            # Get attendance updated timestamp
-            att_resp = supabase.table("attendance").select("created_at,updated_at").eq("user_id", user_id).execute()
-            marks_resp = supabase.table("marks").select("created_at,updated_at").eq("user_id", user_id).execute()
+            # When a scrape last confirmed the data: unchanged content only moves checked_at
+            att_resp = supabase.table("attendance").select("created_at,updated_at,checked_at").eq("user_id", user_id).execute()
+            marks_resp = supabase.table("marks").select("created_at,updated_at,checked_at").eq("user_id", user_id).execute()
             
             updated_at = None
             if att_resp.data and len(att_resp.data) > 0:
-                updated_at = att_resp.data[0].get("updated_at")
+                updated_at = last_confirmed_at(att_resp.data[0])
             elif marks_resp.data and len(marks_resp.data) > 0:
-                updated_at = marks_resp.data[0].get("updated_at")
+                updated_at = last_confirmed_at(marks_resp.data[0])
                 
             if updated_at:
                 status["updated_at"] = updated_at
         
-        return jsonify({
+        response = {
             "success": True,
             "status": status.get("status", "not_started"),
-            "updated_at": status.get("updated_at", None)
-        }), 200
+            "updated_at": status.get("updated_at", None),
+            "phase": status.get("phase"),
+            "queue_position": status.get("queue_position"),
+            # "unchanged" datasets need not be downloaded again
+            "changes": status.get("changes")
+        }
+        if status.get("queue_position"):
+            response["message"] = f"Waiting for a browser: queued #{status['queue_position']}"
+        return jsonify(response), 200
         
     except Exception as e:
         print(f"Error checking refresh status: {e}")
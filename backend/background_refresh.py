@@ -0,0 +1,199 @@
+"""
+Staggered background refresh of active users' attendance and marks.
+
+Without this, data only updates when a user logs in or presses refresh, so
+everyone refreshing at 9 am is our worst load spike. The scheduler walks the
+active users once every BACKGROUND_REFRESH_INTERVAL, spacing refreshes
+evenly across the interval (with jitter so gunicorn restarts don't line the
+cycles up) and pausing during quiet hours. Each refresh is handed to a
+submit callback, which queues it as a background-priority job, so it
+coalesces with user requests and never takes a slot ahead of one.
+
+Only one process per host runs the scheduler: the others fail to take the
+leader lock and keep retrying in case the leader dies.
+
+A user counts as active when they made an API request (users.last_seen_at,
+written by mark_user_seen) within BACKGROUND_ACTIVE_DAYS. Stored-session
+timestamps won't do: the scheduler's own re-logins refresh those, which
+would keep a user who never returns active forever.
+"""
+import os
+import time
+import random
+import logging
+import hashlib
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+try:
+    import fcntl
+except ImportError:  # No cross-process leader election without flock; every process may lead
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ====== Background Refresh Configuration ======
+BACKGROUND_REFRESH_ENABLED = os.getenv("BACKGROUND_REFRESH_ENABLED", "false").lower() == "true"
+BACKGROUND_REFRESH_INTERVAL = float(os.getenv("BACKGROUND_REFRESH_INTERVAL", str(4 * 3600)))
+BACKGROUND_REFRESH_JITTER = float(os.getenv("BACKGROUND_REFRESH_JITTER", "0.2"))
+BACKGROUND_ACTIVE_DAYS = float(os.getenv("BACKGROUND_ACTIVE_DAYS", "7"))
+BACKGROUND_QUIET_HOURS = os.getenv("BACKGROUND_QUIET_HOURS", "0-6")
+BACKGROUND_TIMEZONE = os.getenv("BACKGROUND_TIMEZONE", "Asia/Kolkata")
+BACKGROUND_LEADER_LOCK = os.getenv(
+    "BACKGROUND_LEADER_LOCK", os.path.join(tempfile.gettempdir(), "academia_background_refresh.lock")
+)
+LAST_SEEN_WRITE_INTERVAL = float(os.getenv("LAST_SEEN_WRITE_INTERVAL", "600"))
+LEADER_RETRY_SECONDS = 60
+IDLE_RETRY_SECONDS = 300
+
+
+def parse_quiet_hours(value):
+    """"0-6" -> (0, 6): no refreshes from 00:00 until 06:00; "23-5" wraps past midnight"""
+    try:
+        start, end = (int(part) for part in value.split("-"))
+    except ValueError:
+        if value.strip():
+            logger.warning(f"⚠️ Ignoring invalid BACKGROUND_QUIET_HOURS: {value}")
+        return None
+    return (start % 24, end % 24) if start != end else None
+
+
+_last_seen_writes = {}
+_last_seen_lock = threading.Lock()
+
+
+def mark_user_seen(supabase, user_id):
+    """Record a real user request in users.last_seen_at, at most once per LAST_SEEN_WRITE_INTERVAL per process"""
+    now = time.time()
+    with _last_seen_lock:
+        if now - _last_seen_writes.get(user_id, 0) < LAST_SEEN_WRITE_INTERVAL:
+            return
+        _last_seen_writes[user_id] = now
+    try:
+        supabase.table("users").update({"last_seen_at": datetime.now().isoformat()}).eq("id", user_id).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not record last_seen_at for user {user_id}: {e}")
+
+
+def stable_order(email):
+    """Per-user sort key, so each user sits at the same point of every cycle"""
+    return hashlib.sha1(email.encode()).hexdigest()
+
+
+class BackgroundRefresher:
+    """Refreshes every active user once per interval, evenly spread, outside quiet hours"""
+    def __init__(self, supabase, submit, interval=BACKGROUND_REFRESH_INTERVAL, jitter=BACKGROUND_REFRESH_JITTER):
+        self.supabase = supabase
+        self.submit = submit
+        self.interval = interval
+        self.jitter = jitter
+        self.quiet_hours = parse_quiet_hours(BACKGROUND_QUIET_HOURS)
+        self.timezone = ZoneInfo(BACKGROUND_TIMEZONE)
+        self.leader = False
+        self._lock_handle = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"cycles": 0, "submitted": 0, "quiet_pauses": 0, "errors": 0, "last_cycle_users": 0,
+                      "last_cycle_started": None}
+
+    def start(self):
+        if self._thread:
+            return self
+        self._thread = threading.Thread(target=self.run, name="background-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def acquire_leadership(self):
+        """Take the host-wide leader lock without blocking"""
+        if fcntl is None:
+            return True
+        handle = open(BACKGROUND_LEADER_LOCK, "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._lock_handle = handle
+        return True
+
+    def in_quiet_hours(self, now=None):
+        if not self.quiet_hours:
+            return False
+        hour = (now or datetime.now(self.timezone)).hour
+        start, end = self.quiet_hours
+        return start <= hour < end if start < end else hour >= start or hour < end
+
+    def seconds_until_active(self):
+        """How long until quiet hours end"""
+        now = datetime.now(self.timezone)
+        end = now.replace(hour=self.quiet_hours[1], minute=0, second=0, microsecond=0)
+        if end <= now:
+            end += timedelta(days=1)
+        return (end - now).total_seconds()
+
+    def active_users(self):
+        """(email, password) for users who made an API request within BACKGROUND_ACTIVE_DAYS"""
+        cutoff = (datetime.now() - timedelta(days=BACKGROUND_ACTIVE_DAYS)).isoformat()
+        resp = self.supabase.table("users").select("*").gte("last_seen_at", cutoff).execute()
+        # Stored cookies carry the refresh; a password (when we have one) lets it log in again
+        passwords = {row["email"]: row.get("password") for row in resp.data or [] if row.get("email")}
+        return [(email, passwords[email]) for email in sorted(passwords, key=stable_order)]
+
+    def wait(self, seconds):
+        """Sleep unless stopped; returns True when stopped"""
+        return self._stop.wait(max(0.0, seconds))
+
+    def run(self):
+        while not self.acquire_leadership():
+            if self.wait(LEADER_RETRY_SECONDS):
+                return
+        self.leader = True
+        logger.info(f"✅ Background refresh scheduler leading (every {self.interval / 3600:.1f}h, quiet hours {BACKGROUND_QUIET_HOURS})")
+
+        # Start at a random point so restarts don't hit the portal in lockstep
+        if self.wait(random.uniform(0, min(self.interval, 300))):
+            return
+        while not self._stop.is_set():
+            try:
+                users = self.active_users()
+            except Exception as e:
+                logger.error(f"❌ Background refresh could not list active users: {e}")
+                self.stats["errors"] += 1
+                users = []
+            if not users:
+                if self.wait(IDLE_RETRY_SECONDS):
+                    return
+                continue
+            if self.run_cycle(users):
+                return
+
+    def run_cycle(self, users):
+        """Submit one refresh per user spread over the interval; returns True when stopped"""
+        self.stats["cycles"] += 1
+        self.stats["last_cycle_users"] = len(users)
+        self.stats["last_cycle_started"] = datetime.utcnow().isoformat()
+        spacing = self.interval / len(users)
+        logger.info(f"Background refresh cycle: {len(users)} users, one every {spacing:.0f}s")
+        for email, password in users:
+            if self.in_quiet_hours():
+                self.stats["quiet_pauses"] += 1
+                if self.wait(self.seconds_until_active()):
+                    return True
+            try:
+                self.submit(email, password)
+                self.stats["submitted"] += 1
+            except Exception as e:
+                logger.error(f"❌ Background refresh for {email} could not be queued: {e}")
+                self.stats["errors"] += 1
+            if self.wait(spacing * random.uniform(1 - self.jitter, 1 + self.jitter)):
+                return True
+        return False
+
+    def get_stats(self):
+        return dict(self.stats, enabled=True, leader=self.leader, interval_seconds=self.interval,
+                    quiet_hours=BACKGROUND_QUIET_HOURS, in_quiet_hours=self.in_quiet_hours())
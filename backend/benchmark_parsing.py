@@ -0,0 +1,106 @@
+"""
+Benchmark full-page vs targeted (table-only) parsing of a saved attendance page.
+
+For every installed parser backend, parses the page with and without
+TARGETED_PARSING, extracts everything a scrape reads (attendance, marks,
+timetable, details) and reports time, allocations and tree size. Every
+result is checked against the original html.parser full-page output.
+
+    python benchmark_parsing.py [--html attendance_page.html] [--runs 20]
+
+Needs the same environment as the scraper (SUPABASE_URL/SUPABASE_KEY, e.g.
+from .env) because the BeautifulSoup extractors live on SRMScraper.
+"""
+import os
+import time
+import argparse
+import logging
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import html_parsing
+from html_parsing import ParsedDocument, SELECTOLAX_FIELDS, parse_tree
+
+KINDS = ("attendance", "marks", "timetable", "details")
+
+
+def document_factory(scraper, backend):
+    """(parse, fields) for a backend, the same pairs SRMScraper.parsed_document uses"""
+    if backend == "selectolax":
+        return parse_tree, SELECTOLAX_FIELDS
+    return (lambda html: BeautifulSoup(html, backend)), scraper.soup_fields()
+
+
+def extract_all(html, parse, fields, targeted):
+    document = ParsedDocument(html, parse, fields, targeted=targeted)
+    return document, {kind: document.extract(kind) for kind in KINDS}
+
+
+def tree_size(document):
+    tree = document.tree
+    if isinstance(tree, BeautifulSoup):
+        return sum(1 for _ in tree.descendants)
+    return sum(1 for _ in tree.root.traverse(include_text=True))
+
+
+def measure(html, parse, fields, targeted, runs):
+    # Allocation profile of a single run (tracemalloc slows everything down, so time separately)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    document, result = extract_all(html, parse, fields, targeted)
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    allocated_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    started = time.perf_counter()
+    for _ in range(runs):
+        extract_all(html, parse, fields, targeted)
+    seconds = (time.perf_counter() - started) / runs
+    return {
+        "result": result,
+        "ms": seconds * 1000,
+        "peak_mb": peak / 1e6,
+        "blocks": allocated_blocks,
+        "nodes": tree_size(document),
+        "targeted": document.targeted
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark targeted vs full-page parsing")
+    parser.add_argument("--html", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "attendance_page.html"))
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    import srm_scrapper
+    scraper = srm_scrapper.SRMScraper("benchmark@example.com", None)
+
+    with open(args.html, encoding="utf-8") as f:
+        html = f.read()
+    fragment = html_parsing.target_regions(html) or ""
+    print(f"{os.path.basename(args.html)}: {len(html) / 1024:.0f} KB, targeted regions {len(fragment) / 1024:.1f} KB\n")
+
+    parse, fields = document_factory(scraper, "html.parser")
+    reference = extract_all(html, parse, fields, targeted=False)[1]
+
+    print(f"{'backend':<12} {'mode':<9} {'ms/page':>8} {'peak MB':>8} {'blocks':>8} {'nodes':>7}  identical")
+    for backend in html_parsing.PARSER_BACKENDS:
+        if not html_parsing._available(backend):
+            print(f"{backend:<12} (not installed)")
+            continue
+        parse, fields = document_factory(scraper, backend)
+        full = None
+        for targeted in (False, True):
+            stats = measure(html, parse, fields, targeted, args.runs)
+            mode = "targeted" if targeted else "full"
+            speedup = f"  ({full['ms'] / stats['ms']:.1f}x faster, {full['blocks'] / max(stats['blocks'], 1):.1f}x fewer blocks)" if full else ""
+            print(f"{backend:<12} {mode:<9} {stats['ms']:>8.1f} {stats['peak_mb']:>8.2f} {stats['blocks']:>8} {stats['nodes']:>7}  "
+                  f"{stats['result'] == reference}{speedup}")
+            full = full or stats
+
+
+if __name__ == "__main__":
+    main()
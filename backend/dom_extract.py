@@ -0,0 +1,231 @@
+"""
+In-browser extraction backend.
+
+Instead of serialising the whole DOM and re-parsing it with BeautifulSoup,
+each script below runs inside the page with execute_script and returns only
+the cells the parsers need, as compact JSON, in one WebDriver round trip.
+The shapes match the BeautifulSoup extractors in SRMScraper, so both
+backends feed the same record builders:
+
+    attendance: {"registration_number": str, "rows": [[8 cell texts], ...] or None}
+    marks:      {"registration_number": str, "rows": [[code, title, [[test, obtained], ...]], ...] or None}
+    timetable:  {"headers": [...], "rows": [[cell texts], ...]} or None
+    details:    {"registration_number": str, "batch": str}
+
+EXTRACTION_BACKEND selects "soup" (default), "js", or "compare" (run both
+on the same page, keep the soup result and count mismatches).
+"""
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ====== Extraction Configuration ======
+EXTRACTION_BACKEND = os.getenv("EXTRACTION_BACKEND", "soup").lower()
+EXTRACTION_KINDS = ("attendance", "marks", "timetable", "details")
+
+# Helpers shared by every script. stripped() mirrors get_text(strip=True),
+# bsString() mirrors BeautifulSoup's .string
+COMMON_JS = r"""
+function stripped(el) {
+    var parts = [], walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT, null, false), node;
+    while ((node = walker.nextNode())) {
+        var text = node.nodeValue.trim();
+        if (text) parts.push(text);
+    }
+    return parts.join('');
+}
+function bsString(el) {
+    if (el.childNodes.length !== 1) return null;
+    var child = el.childNodes[0];
+    if (child.nodeType === 3) return child.nodeValue;
+    if (child.nodeType === 1) return bsString(child);
+    return null;
+}
+function nextTd(tds, i) {
+    return i + 1 < tds.length ? tds[i + 1] : null;
+}
+function registrationNumber() {
+    var tds = document.getElementsByTagName('td');
+    for (var i = 0; i < tds.length; i++) {
+        var label = bsString(tds[i]);
+        if (label !== null && label.indexOf('Registration Number') !== -1) {
+            var value = nextTd(tds, i);
+            if (value) {
+                var strong = value.querySelector('strong') || value.querySelector('b');
+                var reg = stripped(strong || value);
+                if (reg) return reg;
+            }
+            break;
+        }
+    }
+    var rows = document.getElementsByTagName('tr');
+    for (var r = 0; r < rows.length; r++) {
+        var cells = rows[r].getElementsByTagName('td');
+        if (cells.length >= 2 && cells[0].textContent.indexOf('Registration') !== -1) {
+            var candidate = stripped(cells[1]);
+            if (candidate) return candidate;
+            break;
+        }
+    }
+    var match = document.documentElement.textContent.match(/RA\d{10,}/);
+    return match ? match[0] : null;
+}
+"""
+
+ATTENDANCE_JS = COMMON_JS + r"""
+var rows = [], found = false, tables = document.getElementsByTagName('table');
+for (var t = 0; t < tables.length; t++) {
+    if (tables[t].textContent.indexOf('Course Code') === -1) continue;
+    found = true;
+    var trs = tables[t].getElementsByTagName('tr');
+    for (var r = 1; r < trs.length; r++) {
+        var tds = trs[r].getElementsByTagName('td');
+        if (tds.length < 8) continue;
+        var row = [];
+        for (var c = 0; c < 8; c++) row.push(tds[c].textContent.trim());
+        rows.push(row);
+    }
+}
+return {registration_number: registrationNumber(), rows: found ? rows : null};
+"""
+
+MARKS_JS = COMMON_JS + r"""
+var table = null, tables = document.getElementsByTagName('table');
+for (var t = 0; t < tables.length; t++) {
+    var header = tables[t].getElementsByTagName('tr')[0];
+    if (header && header.textContent.indexOf('Test Performance') !== -1) { table = tables[t]; break; }
+}
+if (!table) return {registration_number: registrationNumber(), rows: null};
+var rows = [], trs = table.getElementsByTagName('tr');
+for (var r = 1; r < trs.length; r++) {
+    var tds = trs[r].getElementsByTagName('td');
+    if (tds.length < 3) continue;
+    var tests = [], broken = false, nested = tds[2].querySelector('table');
+    if (nested) {
+        var cells = nested.getElementsByTagName('td');
+        for (var c = 0; c < cells.length; c++) {
+            var strong = cells[c].querySelector('strong');
+            if (!strong) continue;
+            var br = cells[c].querySelector('br'), obtained = '0';
+            if (br && br.nextSibling) {
+                // The soup parser skips rows where the mark isn't a bare text node
+                if (br.nextSibling.nodeType !== 3) { broken = true; break; }
+                obtained = br.nextSibling.nodeValue.trim();
+            }
+            tests.push([stripped(strong), obtained]);
+        }
+    }
+    if (!broken) rows.push([stripped(tds[0]), stripped(tds[1]), tests]);
+}
+return {registration_number: registrationNumber(), rows: rows};
+"""
+
+TIMETABLE_JS = COMMON_JS + r"""
+var table = document.querySelector('table.course_tbl');
+if (!table) {
+    var tables = document.getElementsByTagName('table');
+    for (var t = 0; t < tables.length; t++) {
+        if (tables[t].textContent.indexOf('Course Code') !== -1) { table = tables[t]; break; }
+    }
+}
+if (!table) return null;
+var trs = table.getElementsByTagName('tr');
+if (!trs.length) return {headers: [], rows: []};
+var headers = [], headerCells = trs[0].querySelectorAll('th, td');
+for (var h = 0; h < headerCells.length; h++) headers.push(stripped(headerCells[h]));
+var rows = [];
+for (var r = 1; r < trs.length; r++) {
+    var tds = trs[r].getElementsByTagName('td'), row = [];
+    for (var c = 0; c < tds.length; c++) row.push(stripped(tds[c]));
+    rows.push(row);
+}
+return {headers: headers, rows: rows};
+"""
+
+DETAILS_JS = COMMON_JS + r"""
+function isDigits(text) { return /^\d+$/.test(text); }
+function batchNumber() {
+    var tds = document.getElementsByTagName('td'), i, label, next;
+    for (i = 0; i < tds.length; i++) {
+        label = bsString(tds[i]);
+        if (label !== null && label.indexOf('Batch:') !== -1) {
+            next = nextTd(tds, i);
+            if (next && isDigits(stripped(next))) return stripped(next);
+            break;
+        }
+    }
+    for (i = 0; i < tds.length; i++) {
+        label = bsString(tds[i]);
+        if (label !== null && label.indexOf('Batch') !== -1 && label.indexOf(':') === -1) {
+            next = nextTd(tds, i);
+            if (next && isDigits(stripped(next))) return stripped(next);
+            break;
+        }
+    }
+    var rows = document.getElementsByTagName('tr');
+    for (var r = 0; r < rows.length; r++) {
+        var cells = rows[r].getElementsByTagName('td');
+        for (var c = 0; c + 1 < cells.length; c++) {
+            if (cells[c].textContent.indexOf('Batch') !== -1 && isDigits(stripped(cells[c + 1]))) return stripped(cells[c + 1]);
+        }
+    }
+    var match = document.documentElement.outerHTML.match(/Batch:?\s*<\/td>\s*<td[^>]*>\s*(\d+)\s*<\/td>/i);
+    if (match) return match[1];
+    var strongs = document.getElementsByTagName('strong');
+    for (var s = 0; s < strongs.length; s++) {
+        var text = bsString(strongs[s]);
+        if (text !== null && /^\d$/.test(text)) return text;
+    }
+    return null;
+}
+return {registration_number: registrationNumber(), batch: batchNumber()};
+"""
+
+SCRIPTS = {
+    "attendance": ATTENDANCE_JS,
+    "marks": MARKS_JS,
+    "timetable": TIMETABLE_JS,
+    "details": DETAILS_JS
+}
+
+# Process-wide counters, exposed through /api/scraper-metrics
+extraction_stats = {
+    kind: {"js_runs": 0, "js_seconds": 0.0, "soup_runs": 0, "soup_seconds": 0.0, "matches": 0, "mismatches": 0}
+    for kind in EXTRACTION_KINDS
+}
+_stats_lock = threading.Lock()
+
+
+def record_run(kind, backend, seconds):
+    with _stats_lock:
+        extraction_stats[kind][f"{backend}_runs"] += 1
+        extraction_stats[kind][f"{backend}_seconds"] += seconds
+
+
+def record_comparison(kind, soup_result, js_result):
+    """Count whether both backends agreed on the same page, logging the first difference"""
+    matched = soup_result == js_result
+    with _stats_lock:
+        extraction_stats[kind]["matches" if matched else "mismatches"] += 1
+    if not matched:
+        logger.warning(f"⚠️ Extraction backends disagree on {kind}: soup={str(soup_result)[:300]} js={str(js_result)[:300]}")
+    return matched
+
+
+def get_extraction_stats():
+    with _stats_lock:
+        return {
+            kind: dict(stats, js_seconds=round(stats["js_seconds"], 3), soup_seconds=round(stats["soup_seconds"], 3))
+            for kind, stats in extraction_stats.items()
+        }
+
+
+def run_extraction(driver, kind):
+    """Run the extraction script for `kind` in the current page and return its compact result"""
+    started = time.time()
+    result = driver.execute_script(SCRIPTS[kind])
+    record_run(kind, "js", time.time() - started)
+    return result
@@ -0,0 +1,176 @@
+"""
+Warm pool of pre-launched headless Chrome drivers.
+
+Launching Chrome (and walking the driver fallback chain) costs several seconds
+per scrape. The pool keeps a small number of drivers alive between scrapes:
+scrapers lease a driver, use it, and hand it back scrubbed (cookies, storage
+and extra tabs cleared). Drivers are recycled after a number of uses or when
+the Chrome process tree grows past an RSS ceiling.
+"""
+import os
+import time
+import logging
+import threading
+from memory_watchdog import driver_process_tree_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# ====== Pool Configuration ======
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "1"))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "20"))
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "450"))
+
+
+class DriverPool:
+    """
+    Thread-safe pool of warm Chrome drivers.
+    `factory` is a zero-argument callable returning a new driver.
+    A size of 0 disables pooling: every lease launches Chrome and every release quits it.
+    """
+    def __init__(self, factory, size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES, max_rss_mb=DRIVER_MAX_RSS_MB):
+        self.factory = factory
+        self.size = max(0, size)
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle = []
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._warming = False
+        self.stats = {
+            "launched": 0,
+            "reused": 0,
+            "recycled": 0,
+            "unhealthy": 0
+        }
+
+    def _launch(self):
+        started = time.time()
+        driver = self.factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self.stats["launched"] += 1
+        logger.info(f"✅ Launched pooled Chrome driver in {time.time() - started:.2f}s")
+        return driver
+
+    def _quit(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"⚠️ Error quitting pooled driver: {e}")
+
+    def is_healthy(self, driver):
+        """Cheap liveness probe: the browser answers a script call and still has a window"""
+        try:
+            return driver.execute_script("return 1") == 1 and len(driver.window_handles) > 0
+        except Exception:
+            return False
+
+    def scrub(self, driver):
+        """Close extra tabs and clear cookies, storage and cache so the next lease starts clean"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        try:
+            # Storage is per-origin, so clear it while still on the scraped page
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        driver.get("about:blank")
+
+    def acquire(self):
+        """Lease a healthy driver, launching a new one if none is idle"""
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                return self._launch()
+            if self.is_healthy(driver):
+                with self._lock:
+                    self.stats["reused"] += 1
+                logger.info("♻️ Reusing warm Chrome driver from pool")
+                return driver
+            logger.warning("⚠️ Discarding unhealthy pooled driver")
+            with self._lock:
+                self.stats["unhealthy"] += 1
+            self._quit(driver)
+
+    def release(self, driver, discard=False):
+        """Return a leased driver to the pool, or quit it if it is worn out, oversized or broken"""
+        if driver is None:
+            return
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+
+        reason = None
+        if discard:
+            reason = "discarded by caller"
+        elif uses >= self.max_uses:
+            reason = f"reached {uses} uses"
+        else:
+            rss = driver_process_tree_rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                reason = f"RSS {rss:.0f} MB exceeds {self.max_rss_mb:.0f} MB"
+
+        if reason is None:
+            try:
+                self.scrub(driver)
+            except Exception as e:
+                reason = f"scrub failed: {e}"
+
+        with self._lock:
+            keep = reason is None and len(self._idle) < self.size
+            if keep:
+                self._idle.append(driver)
+            elif reason:
+                self.stats["recycled"] += 1
+
+        if keep:
+            logger.info("✅ Driver returned to pool")
+            return
+        if reason:
+            logger.info(f"Recycling pooled driver: {reason}")
+        self._quit(driver)
+        if reason:
+            self.warm()
+
+    def warm(self):
+        """Launch drivers in the background until the pool holds `size` idle drivers"""
+        with self._lock:
+            if self._warming or len(self._idle) >= self.size:
+                return
+            self._warming = True
+
+        def fill():
+            try:
+                while True:
+                    with self._lock:
+                        if len(self._idle) >= self.size:
+                            break
+                    driver = self._launch()
+                    with self._lock:
+                        self._idle.append(driver)
+            except Exception as e:
+                logger.error(f"❌ Failed to warm driver pool: {e}")
+            finally:
+                with self._lock:
+                    self._warming = False
+
+        threading.Thread(target=fill, daemon=True).start()
+
+    def shutdown(self):
+        """Quit every idle driver"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, idle=len(self._idle), size=self.size)
@@ -0,0 +1,170 @@
+"""
+Chrome driver provisioning.
+
+Works out once per process which way of starting chromedriver works on this
+host (explicit path, Selenium's own resolution, webdriver-manager, or
+undetected_chromedriver), caches the resolved chromedriver binary on disk and
+validates the cache at boot. Later launches go straight to the known-good
+strategy instead of walking the fallback chain with sleeps in between.
+"""
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+import subprocess
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+logger = logging.getLogger(__name__)
+
+# ====== Provisioning Configuration ======
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+CHROMEDRIVER_CACHE_FILE = os.getenv(
+    "CHROMEDRIVER_CACHE_FILE",
+    os.path.join(tempfile.gettempdir(), "academia_chromedriver.json")
+)
+RENDER_CHROMEDRIVER_PATH = "/opt/render/.local/share/webdriver/chromedriver"
+
+
+def is_valid_driver_binary(path):
+    """A chromedriver path is usable if it exists, is executable and answers --version"""
+    if not path or not os.path.isfile(path) or not os.access(path, os.X_OK):
+        return False
+    try:
+        result = subprocess.run([path, "--version"], capture_output=True, timeout=10)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+
+class DriverProvisioner:
+    """Resolves and remembers how to launch Chrome on this host"""
+    def __init__(self, cache_file=CHROMEDRIVER_CACHE_FILE):
+        self.cache_file = cache_file
+        self.strategy = None
+        self.driver_path = None
+        self._lock = threading.Lock()
+
+    def boot(self):
+        """Load the cached strategy and drop it if the cached binary is no longer valid"""
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        strategy, path = cached.get("strategy"), cached.get("driver_path")
+        if strategy == "path" and not is_valid_driver_binary(path):
+            logger.warning(f"⚠️ Cached chromedriver {path} is no longer valid; will re-resolve")
+            self.forget()
+            return
+        self.strategy, self.driver_path = strategy, path
+        logger.info(f"✅ Using cached driver strategy '{strategy}' {path or ''}")
+
+    def remember(self, strategy, driver_path=None):
+        self.strategy, self.driver_path = strategy, driver_path
+        try:
+            with open(self.cache_file, "w") as f:
+                json.dump({"strategy": strategy, "driver_path": driver_path}, f)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write driver cache {self.cache_file}: {e}")
+
+    def forget(self):
+        self.strategy, self.driver_path = None, None
+        try:
+            os.remove(self.cache_file)
+        except OSError:
+            pass
+
+    def _launch_with_path(self, chrome_options, path):
+        return webdriver.Chrome(service=Service(executable_path=path), options=chrome_options)
+
+    def _launch_undetected(self, chrome_options):
+        import undetected_chromedriver as uc
+        last_error = None
+        for attempt in range(3):
+            try:
+                return uc.Chrome(headless=True, options=chrome_options)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ undetected_chromedriver attempt {attempt+1} failed: {e}")
+        raise Exception(f"All undetected_chromedriver attempts failed: {last_error}")
+
+    def _launch_known(self, chrome_options):
+        if self.strategy == "path":
+            return self._launch_with_path(chrome_options, self.driver_path)
+        if self.strategy == "undetected":
+            return self._launch_undetected(chrome_options)
+        return webdriver.Chrome(options=chrome_options)
+
+    def _resolve(self, chrome_options):
+        """Walk every strategy once and remember the first that works"""
+        # 1) Explicitly configured or previously installed binaries
+        for path in (CHROMEDRIVER_PATH, RENDER_CHROMEDRIVER_PATH):
+            if is_valid_driver_binary(path):
+                try:
+                    driver = self._launch_with_path(chrome_options, path)
+                    self.remember("path", path)
+                    return driver
+                except Exception as e:
+                    logger.warning(f"⚠️ chromedriver at {path} failed: {e}")
+
+        # 2) Selenium's own driver resolution; cache whatever binary it picked
+        try:
+            driver = webdriver.Chrome(options=chrome_options)
+            resolved = getattr(getattr(driver, "service", None), "path", None)
+            if is_valid_driver_binary(resolved):
+                self.remember("path", resolved)
+            else:
+                self.remember("direct")
+            return driver
+        except Exception as e:
+            logger.warning(f"⚠️ Direct initialization failed: {e}")
+
+        # 3) webdriver-manager download (network); cache the installed binary
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+            driver = self._launch_with_path(chrome_options, path)
+            self.remember("path", path)
+            return driver
+        except Exception as e:
+            logger.warning(f"⚠️ Webdriver-manager initialization failed: {e}")
+
+        # 4) undetected_chromedriver as the last resort
+        try:
+            driver = self._launch_undetected(chrome_options)
+            self.remember("undetected")
+            return driver
+        except Exception as e:
+            logger.error(f"❌ All initialization methods failed: {e}")
+            logger.error("Please make sure Chrome is installed on this system.")
+            raise Exception("Failed to initialize Chrome driver after multiple attempts")
+
+    def launch(self, chrome_options):
+        """Launch Chrome with the known-good strategy, resolving it on first use"""
+        started = time.time()
+        if self.strategy:
+            try:
+                driver = self._launch_known(chrome_options)
+                logger.info(f"✅ Chrome driver initialized via '{self.strategy}' in {time.time() - started:.2f}s")
+                return driver
+            except Exception as e:
+                logger.warning(f"⚠️ Known-good strategy '{self.strategy}' failed, re-resolving: {e}")
+                self.forget()
+
+        with self._lock:
+            # Another thread may have resolved the strategy while we waited
+            driver = self._launch_known(chrome_options) if self.strategy else self._resolve(chrome_options)
+        logger.info(f"✅ Chrome driver initialized via '{self.strategy}' in {time.time() - started:.2f}s")
+        return driver
+
+
+provisioner = DriverProvisioner()
+provisioner.boot()
+
+
+def launch_chrome(chrome_options):
+    """Launch a Chrome driver using the process-wide provisioner"""
+    return provisioner.launch(chrome_options)
@@ -0,0 +1,138 @@
+"""
+Freshness policy for stored datasets.
+
+A refresh request for data that a scrape confirmed a few minutes ago is
+answered from the database instead of starting a browser. Each dataset has
+its own window; a dataset counts as fresh when its last confirmation
+(checked_at, or updated_at for rows written before change detection) is
+inside the window. A forced refresh bypasses the window but is rate limited
+per user by REFRESH_FORCE_COOLDOWN_SECONDS, tracked in users.last_forced_refresh_at
+so the limit holds across gunicorn workers and restarts.
+
+The timetable barely changes within a semester, so it follows a different
+rule: it is re-scraped only when the course registration fingerprint taken
+from the attendance page no longer matches the one the stored timetable was
+built for, or when the stored timetable is older than TIMETABLE_TTL_SECONDS.
+"""
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+# ====== Freshness Configuration ======
+FRESHNESS_WINDOWS = {
+    "attendance": float(os.getenv("ATTENDANCE_FRESHNESS_SECONDS", "900")),
+    "marks": float(os.getenv("MARKS_FRESHNESS_SECONDS", "900"))
+}
+REFRESH_FORCE_COOLDOWN_SECONDS = float(os.getenv("REFRESH_FORCE_COOLDOWN_SECONDS", "120"))
+TIMETABLE_TTL_SECONDS = float(os.getenv("TIMETABLE_TTL_SECONDS", str(14 * 24 * 3600)))
+
+DATA_COLUMNS = {"attendance": "attendance_data", "marks": "marks_data"}
+
+
+def parse_db_timestamp(value):
+    """Parse a Supabase timestamp into an aware UTC datetime; naive values are stored in UTC"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def seconds_since(value):
+    parsed = parse_db_timestamp(value)
+    if parsed is None:
+        return None
+    return (datetime.now(timezone.utc) - parsed).total_seconds()
+
+
+def last_confirmed_at(row):
+    """The later of a row's updated_at and checked_at, as stored"""
+    stamps = [value for value in (row.get("updated_at"), row.get("checked_at")) if parse_db_timestamp(value)]
+    return max(stamps, key=parse_db_timestamp) if stamps else None
+
+
+def row_age_seconds(row):
+    """Seconds since a scrape last confirmed this row, or None when unknown"""
+    ages = [age for age in (seconds_since(row.get("checked_at")), seconds_since(row.get("updated_at"))) if age is not None]
+    return min(ages) if ages else None
+
+
+def load_fresh_datasets(supabase, user_id, datasets=("attendance", "marks")):
+    """
+    {dataset: {"data": ..., "age_seconds": ...}} when every dataset is inside its
+    freshness window, otherwise None. A dataset without records counts as fresh only when a
+    scrape confirmed it (checked_at); placeholder rows never do.
+    """
+    fresh = {}
+    for dataset in datasets:
+        column = DATA_COLUMNS[dataset]
+        try:
+            resp = supabase.table(dataset).select(f"{column}, updated_at, checked_at").eq("user_id", user_id).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Freshness check on {dataset} failed: {e}")
+            return None
+        if not resp.data:
+            return None
+        row = resp.data[0]
+        age = row_age_seconds(row)
+        data = row.get(column) or {}
+        if age is None or age > FRESHNESS_WINDOWS[dataset]:
+            return None
+        if not data.get("records") and not row.get("checked_at"):
+            return None
+        fresh[dataset] = {"data": data, "age_seconds": round(age)}
+    return fresh
+
+
+def force_cooldown_remaining(last_started_at):
+    """Seconds until a forced refresh is allowed again after a scrape started at last_started_at"""
+    age = seconds_since(last_started_at)
+    if age is None:
+        return 0
+    return max(0, round(REFRESH_FORCE_COOLDOWN_SECONDS - age))
+
+
+def claim_forced_refresh(supabase, user_id):
+    """
+    Record a forced refresh for this user unless one ran within the cooldown. Returns 0 when
+    claimed, else the seconds to wait. The conditional update lets only one request win a race.
+    """
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(seconds=REFRESH_FORCE_COOLDOWN_SECONDS)).isoformat()
+    try:
+        claimed = supabase.table("users").update({"last_forced_refresh_at": now.isoformat()}).eq("id", user_id).or_(
+            f"last_forced_refresh_at.is.null,last_forced_refresh_at.lt.{cutoff}"
+        ).execute()
+        if claimed.data:
+            return 0
+        current = supabase.table("users").select("last_forced_refresh_at").eq("id", user_id).execute()
+    except Exception as e:
+        logger.warning(f"⚠️ Forced refresh cooldown check failed: {e}")
+        return 0
+    last = current.data[0].get("last_forced_refresh_at") if current.data else None
+    # Lost the race to a request that is still inside its cooldown; never report less than a second
+    return max(1, force_cooldown_remaining(last))
+
+
+def timetable_refresh_reason(supabase, user_id):
+    """
+    Why the stored timetable needs a scrape ("missing", "registration_changed", "expired"),
+    or None when it can be served as is.
+    """
+    timetable = supabase.table("timetable").select("registration_fingerprint, updated_at").eq("user_id", user_id).execute()
+    if not timetable.data:
+        return "missing"
+    stored = timetable.data[0]
+    attendance = supabase.table("attendance").select("registration_fingerprint").eq("user_id", user_id).execute()
+    current = attendance.data[0].get("registration_fingerprint") if attendance.data else None
+    # Without a fingerprint on either side only the TTL applies
+    if current and stored.get("registration_fingerprint") and current != stored["registration_fingerprint"]:
+        return "registration_changed"
+    age = seconds_since(stored.get("updated_at"))
+    if age is None or age > TIMETABLE_TTL_SECONDS:
+        return "expired"
+    return None
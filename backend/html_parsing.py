@@ -0,0 +1,299 @@
+"""
+HTML parser backends.
+
+Every parse of a scraped page goes through here instead of calling
+BeautifulSoup(html, "html.parser") directly. HTML_PARSER_BACKEND picks:
+
+    html.parser  BeautifulSoup on the pure-Python tree builder (the original)
+    lxml         BeautifulSoup on the C lxml tree builder; same extractor code, faster build
+    selectolax   lexbor (C) tree walked by the extractors below, which mirror the
+                 BeautifulSoup extractors in SRMScraper and return the same shapes
+                 (see dom_extract for the shapes)
+
+Code that needs a BeautifulSoup tree (make_soup) gets lxml under both fast
+backends. A backend whose library is missing falls back to html.parser.
+
+A scrape reads several things from one page (the registration number, the
+attendance and marks tables, the batch). ParsedDocument parses the page
+once and extracts each of those fields at most once, whichever extractor
+asks for it first.
+
+Everything we extract lives in a handful of tables; most of the ~440 KB
+attendance page is Zoho SPA scaffolding (≈390 KB of it inline scripts). With
+TARGETED_PARSING, the page is cut down to the top-level tables that contain
+one of TARGET_MARKERS before any tree builder sees it, so only those regions
+are tokenised and turned into nodes. A page without such a table is parsed
+whole. benchmark_parsing.py compares both paths on attendance_page.html.
+"""
+import os
+import re
+import logging
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# ====== Parser Configuration ======
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+
+
+def _available(backend):
+    try:
+        if backend == "lxml":
+            import lxml  # noqa: F401
+        elif backend == "selectolax":
+            from selectolax.lexbor import LexborHTMLParser  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _configured_backend():
+    backend = os.getenv("HTML_PARSER_BACKEND", "html.parser").lower()
+    if backend not in PARSER_BACKENDS:
+        logger.warning(f"⚠️ Unknown HTML_PARSER_BACKEND {backend!r}; using html.parser")
+        return "html.parser"
+    if not _available(backend):
+        logger.warning(f"⚠️ HTML_PARSER_BACKEND {backend} is not installed; using html.parser")
+        return "html.parser"
+    return backend
+
+
+PARSER_BACKEND = _configured_backend()
+SOUP_FEATURES = "html.parser" if PARSER_BACKEND == "html.parser" else "lxml"
+
+TARGETED_PARSING = os.getenv("TARGETED_PARSING", "true").lower() == "true"
+# Text that marks a table holding data we extract
+TARGET_MARKERS = ("Course Code", "Test Performance", "Registration Number", "Batch")
+
+_REGION_TAG = re.compile(r"<(?:(script|style)\b|(/?)table\b[^>]*>)", re.IGNORECASE)
+_RAW_TEXT_END = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE)
+}
+
+
+def target_regions(html):
+    """
+    The top-level tables of `html` that contain a TARGET_MARKERS text, joined into one
+    fragment, or None when there are none. Script and style bodies are skipped over so
+    markup inside them cannot open or close a region.
+    """
+    regions, depth, start, pos = [], 0, None, 0
+    while True:
+        tag = _REGION_TAG.search(html, pos)
+        if not tag:
+            break
+        pos = tag.end()
+        raw_text = tag.group(1)
+        if raw_text:
+            end = _RAW_TEXT_END[raw_text.lower()].search(html, pos)
+            if not end:
+                break
+            pos = end.end()
+        elif not tag.group(2):
+            if depth == 0:
+                start = tag.start()
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                regions.append(html[start:tag.end()])
+                start = None
+    if start is not None:
+        # Unclosed table: the tree builders would run it to the end of the page too
+        regions.append(html[start:])
+    regions = [region for region in regions if any(marker in region for marker in TARGET_MARKERS)]
+    return "".join(regions) if regions else None
+
+
+def make_soup(html):
+    """BeautifulSoup tree for code written against the bs4 API, on the fastest configured tree builder"""
+    return BeautifulSoup(html, SOUP_FEATURES)
+
+
+# ---- selectolax extractors ----
+
+def parse_tree(html):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    # get_text() leaves out script and stylesheet contents; lexbor's text() would not
+    tree.strip_tags(["script", "style"])
+    return tree
+
+
+def stripped(node):
+    """get_text(strip=True)"""
+    return node.text(deep=True, separator="", strip=True)
+
+
+def bs_string(node):
+    """BeautifulSoup's .string: the text of a node with exactly one child, followed down single-child chains"""
+    children = list(node.iter(include_text=True))
+    if len(children) != 1:
+        return None
+    child = children[0]
+    if child.tag == "-text":
+        return child.text_content
+    # Other "-" pseudo-tags are comments and doctypes
+    return None if child.tag.startswith("-") else bs_string(child)
+
+
+def find_labelled_td(tds, predicate):
+    """Index of the first td whose .string satisfies predicate, or -1"""
+    for i, td in enumerate(tds):
+        label = bs_string(td)
+        if label is not None and predicate(label):
+            return i
+    return -1
+
+
+def registration_number(tree):
+    tds = tree.css("td")
+    i = find_labelled_td(tds, lambda text: "Registration Number" in text)
+    if i != -1 and i + 1 < len(tds):
+        value = tds[i + 1]
+        strong = value.css_first("strong") or value.css_first("b")
+        number = stripped(strong or value)
+        if number:
+            return number
+    for row in tree.css("tr"):
+        cells = row.css("td")
+        if len(cells) >= 2 and "Registration" in cells[0].text():
+            number = stripped(cells[1])
+            if number:
+                return number
+            break
+    match = re.search(r'RA\d{10,}', tree.root.text())
+    return match.group(0) if match else None
+
+
+def attendance_rows(tree):
+    tables = [table for table in tree.css("table") if "Course Code" in table.text()]
+    if not tables:
+        return None
+    rows = []
+    for table in tables:
+        for row in table.css("tr")[1:]:
+            cols = row.css("td")
+            if len(cols) >= 8:
+                rows.append([col.text().strip() for col in cols[:8]])
+    return rows
+
+
+def marks_rows(tree):
+    marks_table = None
+    for table in tree.css("table"):
+        header = table.css_first("tr")
+        if header and "Test Performance" in header.text():
+            marks_table = table
+            break
+    if not marks_table:
+        return None
+
+    rows = []
+    for row in marks_table.css("tr")[1:]:
+        cells = row.css("td")
+        if len(cells) < 3:
+            continue
+        nested = cells[2].css_first("table")
+        tests = []
+        skip = False
+        if nested:
+            for cell in nested.css("td"):
+                strong = cell.css_first("strong")
+                if not strong:
+                    continue
+                br = cell.css_first("br")
+                obtained = "0"
+                if br and br.next is not None:
+                    # The soup extractor drops the row when the mark is not a bare text node
+                    if br.next.tag != "-text":
+                        skip = True
+                        break
+                    obtained = br.next.text_content.strip()
+                tests.append([stripped(strong), obtained])
+        if not skip:
+            rows.append([stripped(cells[0]), stripped(cells[1]), tests])
+    return rows
+
+
+def course_table(tree):
+    table = tree.css_first("table.course_tbl")
+    if not table:
+        table = next((t for t in tree.css("table") if "Course Code" in t.text()), None)
+    if not table:
+        return None
+    rows = table.css("tr")
+    if not rows:
+        return {"headers": [], "rows": []}
+    return {
+        "headers": [stripped(cell) for cell in rows[0].css("th, td")],
+        "rows": [[stripped(cell) for cell in row.css("td")] for row in rows[1:]]
+    }
+
+
+def batch_number(tree):
+    tds = tree.css("td")
+    for predicate in (lambda text: "Batch:" in text, lambda text: "Batch" in text and ":" not in text):
+        i = find_labelled_td(tds, predicate)
+        if i != -1 and i + 1 < len(tds):
+            text = stripped(tds[i + 1])
+            if text and text.isdigit():
+                return text
+    for row in tree.css("tr"):
+        cells = row.css("td")
+        for i, cell in enumerate(cells[:-1]):
+            if "Batch" in cell.text():
+                text = stripped(cells[i + 1])
+                if text and text.isdigit():
+                    return text
+    match = re.search(r'Batch:?\s*</td>\s*<td[^>]*>\s*(\d+)\s*</td>', tree.html or "", re.IGNORECASE)
+    if match:
+        return match.group(1)
+    for strong in tree.css("strong"):
+        text = bs_string(strong)
+        if text is not None and text.isdigit() and len(text.strip()) == 1:
+            return text.strip()
+    return None
+
+
+SELECTOLAX_FIELDS = {
+    "registration_number": registration_number,
+    "attendance_rows": attendance_rows,
+    "marks_rows": marks_rows,
+    "course_table": course_table,
+    "batch": batch_number
+}
+
+# Which fields make up each extraction kind's result (timetable is the course table itself)
+KIND_FIELDS = {
+    "attendance": {"registration_number": "registration_number", "rows": "attendance_rows"},
+    "marks": {"registration_number": "registration_number", "rows": "marks_rows"},
+    "details": {"registration_number": "registration_number", "batch": "batch"}
+}
+
+
+class ParsedDocument:
+    """One parse of a page; each field is extracted at most once and shared by every extractor"""
+    def __init__(self, html, parse, fields, targeted=TARGETED_PARSING):
+        self.html = html
+        source = target_regions(html) if targeted else None
+        self.targeted = source is not None
+        self.tree = parse(source if self.targeted else html)
+        self.fields = fields
+        self.values = {}
+
+    def get(self, field):
+        if field not in self.values:
+            self.values[field] = self.fields[field](self.tree)
+        return self.values[field]
+
+    def extract(self, kind):
+        """Result for an extraction kind, in the shapes dom_extract documents"""
+        if kind == "timetable":
+            return self.get("course_table")
+        return {key: self.get(field) for key, field in KIND_FIELDS[kind].items()}
+
+    def matches(self, html):
+        return html is self.html or html == self.html
@@ -0,0 +1,101 @@
+"""
+Browserless HTTP scraping engine for Academia.
+
+The Zoho Creator pages behind the SPA can be fetched directly with a plain
+GET when the portal session cookies are sent (see api/attendence_marks.py).
+This engine takes a {name: value} cookie jar, downloads the attendance or
+timetable page payload and returns HTML that the existing BeautifulSoup
+parsers understand. Selenium remains the fallback when the session is
+missing or expired.
+"""
+import os
+import re
+import html
+import time
+import logging
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ====== URLs and Constants ======
+BASE_URL = "https://academia.srmist.edu.in"
+PAGE_URL = BASE_URL + "/srm_university/academia-academic-services/page/{page}"
+ATTENDANCE_PAGE_NAME = "My_Attendance"
+TIMETABLE_PAGE_NAME = "My_Time_Table_2023_24"
+
+HTTP_SCRAPER_ENABLED = os.getenv("HTTP_SCRAPER_ENABLED", "true").lower() == "true"
+HTTP_TIMEOUT = float(os.getenv("HTTP_SCRAPER_TIMEOUT", "15"))
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": BASE_URL + "/",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+# Zoho wraps the page markup in a JavaScript string passed to the sanitizer
+SANITIZER_PATTERN = re.compile(r"pageSanitizer\.sanitize\('(.*?)'\)\s*;", re.S)
+ZMLVALUE_PATTERN = re.compile(r'zmlvalue="(.*?)"', re.S)
+JS_ESCAPE_PATTERN = re.compile(r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)", re.S)
+JS_SIMPLE_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+
+class SessionExpired(Exception):
+    """The portal answered with the login page instead of the requested payload"""
+
+
+def decode_js_string(value):
+    """Undo JavaScript string escaping (\\xNN, \\uNNNN, \\', \\-, ...)"""
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] in "xu" and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        return JS_SIMPLE_ESCAPES.get(escape, escape)
+    return JS_ESCAPE_PATTERN.sub(replace, value)
+
+
+def decode_page_payload(text):
+    """Extract the page HTML from a Zoho Creator page response"""
+    match = SANITIZER_PATTERN.search(text)
+    if match:
+        return decode_js_string(match.group(1))
+    match = ZMLVALUE_PATTERN.search(text)
+    if match:
+        return html.unescape(match.group(1))
+    return text
+
+
+def looks_like_login_page(status_code, url, text):
+    if status_code in (401, 403):
+        return True
+    if "signin" in url or "accounts/p/" in url:
+        return True
+    return "signinFrame" in text or ("<table" not in text and "sanitize(" not in text)
+
+
+class HttpScraper:
+    """Fetches Academia page payloads over plain HTTP using an authenticated cookie jar"""
+    def __init__(self, cookies, session=None):
+        self.session = session or requests.Session()
+        self.session.headers.update(HEADERS)
+        self.session.cookies.update(cookies or {})
+        self.timings = {}
+
+    def fetch_page(self, page_name):
+        """Return the decoded HTML of an Academia page, or raise SessionExpired"""
+        started = time.time()
+        response = self.session.get(PAGE_URL.format(page=page_name), timeout=HTTP_TIMEOUT)
+        self.timings[page_name] = round(time.time() - started, 3)
+        if looks_like_login_page(response.status_code, response.url, response.text):
+            raise SessionExpired(f"{page_name} returned the login page (HTTP {response.status_code})")
+        response.raise_for_status()
+        page_html = decode_page_payload(response.text)
+        logger.info(f"✅ Fetched {page_name} over HTTP in {self.timings[page_name]:.2f}s ({len(page_html)} chars)")
+        return page_html
+
+    def fetch_attendance_page(self):
+        return self.fetch_page(ATTENDANCE_PAGE_NAME)
+
+    def fetch_timetable_page(self):
+        return self.fetch_page(TIMETABLE_PAGE_NAME)
@@ -0,0 +1,130 @@
+"""
+Memory watchdog for Chrome scrapes.
+
+Samples the RSS of the whole chromedriver -> Chrome process tree while a
+scrape runs. If the tree crosses CHROME_RSS_CEILING_MB, the Chrome processes
+are killed so the scrape fails fast and the driver is recycled, instead of
+the container OOM-killing the gunicorn worker that serves every user.
+"""
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ====== Watchdog Configuration ======
+CHROME_RSS_CEILING_MB = float(os.getenv("CHROME_RSS_CEILING_MB", "600"))
+MEMORY_WATCHDOG_INTERVAL = float(os.getenv("MEMORY_WATCHDOG_INTERVAL", "2"))
+
+# Process-wide metrics, exposed through /api/scraper-metrics
+memory_metrics = {
+    "samples": 0,
+    "last_chrome_rss_mb": None,
+    "peak_chrome_rss_mb": 0.0,
+    "aborts": 0,
+    "ceiling_mb": CHROME_RSS_CEILING_MB
+}
+_metrics_lock = threading.Lock()
+
+
+def driver_process_tree(driver):
+    """Return the psutil processes for the chromedriver service and all of its children"""
+    try:
+        import psutil
+    except ImportError:
+        return []
+
+    pid = None
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None) if service else None
+    if process is not None:
+        pid = process.pid
+    elif getattr(driver, "browser_pid", None):
+        # undetected_chromedriver exposes the browser pid directly
+        pid = driver.browser_pid
+    if not pid:
+        return []
+
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def driver_process_tree_rss_mb(driver):
+    """Return the RSS (MB) of the chromedriver process and all its children, or None if unknown"""
+    processes = driver_process_tree(driver)
+    if not processes:
+        return None
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except Exception:
+            continue
+    return total / 1024 / 1024
+
+
+def python_rss_mb():
+    """RSS (MB) of the current Python process, or None without psutil"""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+    except Exception:
+        return None
+
+
+def get_memory_metrics():
+    with _metrics_lock:
+        return dict(memory_metrics, python_rss_mb=python_rss_mb())
+
+
+class MemoryWatchdog:
+    """Background sampler for one driver; kills its Chrome tree if it crosses the ceiling"""
+    def __init__(self, driver, ceiling_mb=CHROME_RSS_CEILING_MB, interval=MEMORY_WATCHDOG_INTERVAL):
+        self.driver = driver
+        self.ceiling_mb = ceiling_mb
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.tripped = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+        return {"peak_chrome_rss_mb": round(self.peak_rss_mb, 1), "tripped": self.tripped}
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = driver_process_tree_rss_mb(self.driver)
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss)
+                with _metrics_lock:
+                    memory_metrics["samples"] += 1
+                    memory_metrics["last_chrome_rss_mb"] = round(rss, 1)
+                    memory_metrics["peak_chrome_rss_mb"] = round(max(memory_metrics["peak_chrome_rss_mb"], rss), 1)
+                if rss > self.ceiling_mb:
+                    self._abort(rss)
+                    return
+            self._stop.wait(self.interval)
+
+    def _abort(self, rss):
+        """Kill the Chrome processes; the scrape's next WebDriver call fails and the driver is discarded"""
+        self.tripped = True
+        with _metrics_lock:
+            memory_metrics["aborts"] += 1
+        logger.error(f"❌ Chrome RSS {rss:.0f} MB exceeds ceiling {self.ceiling_mb:.0f} MB; aborting scrape")
+        # Kill Chrome but keep chromedriver itself, so quit() can still clean up
+        for proc in driver_process_tree(self.driver)[1:]:
+            try:
+                proc.kill()
+            except Exception:
+                continue
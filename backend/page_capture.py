@@ -0,0 +1,74 @@
+"""
+Page capture for browser scrapes.
+
+driver.page_source serialises the whole live DOM (~440 KB for the attendance
+page) across the WebDriver wire on every call. PageCapture takes one DOM
+snapshot per page load through CDP and hands the same HTML to every parser in
+the run; a new snapshot is only taken when the page has actually changed
+(navigation, or a deliberate re-read after waiting for a slow table).
+"""
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+OUTER_HTML_EXPRESSION = "document.documentElement.outerHTML"
+
+
+def snapshot_dom(driver):
+    """Serialise the current DOM once via CDP, falling back to page_source"""
+    try:
+        result = driver.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": OUTER_HTML_EXPRESSION,
+            "returnByValue": True
+        })
+        value = result.get("result", {}).get("value")
+        if isinstance(value, str):
+            return value
+    except Exception as e:
+        logger.debug(f"CDP snapshot failed, using page_source: {e}")
+    return driver.page_source
+
+
+class PageCapture:
+    """One cached HTML snapshot per page load, shared by every parser in the run"""
+    def __init__(self):
+        self.snapshots = {}
+        self.stats = {"snapshots": 0, "reuses": 0, "bytes": 0, "seconds": 0.0}
+
+    def capture(self, driver, name):
+        """Take a fresh snapshot of the current page and remember it under `name`"""
+        started = time.time()
+        html = snapshot_dom(driver)
+        self.stats["snapshots"] += 1
+        self.stats["bytes"] += len(html)
+        self.stats["seconds"] += time.time() - started
+        self.snapshots[name] = {
+            "html": html,
+            "handle": driver.current_window_handle,
+            "url": driver.current_url
+        }
+        return html
+
+    def get(self, name):
+        """Return the snapshot taken under `name`, or None"""
+        snapshot = self.snapshots.get(name)
+        if not snapshot:
+            return None
+        self.stats["reuses"] += 1
+        return snapshot["html"]
+
+    def current(self, driver):
+        """Snapshot of the page the driver is showing, reusing the cached one if the page hasn't moved"""
+        handle, url = driver.current_window_handle, driver.current_url
+        for snapshot in self.snapshots.values():
+            if snapshot["handle"] == handle and snapshot["url"] == url:
+                self.stats["reuses"] += 1
+                return snapshot["html"]
+        return self.capture(driver, url)
+
+    def clear(self):
+        self.snapshots = {}
+
+    def summary(self):
+        return dict(self.stats, seconds=round(self.stats["seconds"], 3))
@@ -0,0 +1,85 @@
+"""
+Content-ready detection for the Zoho Creator pages on Academia.
+
+The portal is a single-page app: the tables we scrape are injected some time
+after navigation finishes. Instead of sleeping for a fixed worst case, poll
+until the target table exists and its row count has stopped changing.
+"""
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ====== Readiness Configuration ======
+PAGE_READY_TIMEOUT = float(os.getenv("PAGE_READY_TIMEOUT", "40"))
+PAGE_READY_STABLE_SECONDS = float(os.getenv("PAGE_READY_STABLE_SECONDS", "1.0"))
+PAGE_READY_POLL_INTERVAL = 0.25
+
+# Tables that mark each page as rendered
+ATTENDANCE_TABLE_XPATH = "//table[contains(., 'Course Code')]"
+TIMETABLE_TABLE_XPATH = "//table[contains(@class, 'course_tbl')] | //table[contains(., 'Course Code')]"
+
+# One round trip per poll: number of matching tables and the rows inside them
+COUNT_ROWS_SCRIPT = """
+var result = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var rows = 0;
+for (var i = 0; i < result.snapshotLength; i++) {
+    rows += result.snapshotItem(i).getElementsByTagName('tr').length;
+}
+return [result.snapshotLength, rows];
+"""
+
+
+class TableReadinessProbe:
+    """
+    Non-blocking readiness check: each call to check() does one probe and
+    reports whether the table has existed with a stable row count for `stable_for` seconds.
+    """
+    def __init__(self, table_xpath, stable_for=PAGE_READY_STABLE_SECONDS, min_rows=2):
+        self.table_xpath = table_xpath
+        self.stable_for = stable_for
+        self.min_rows = min_rows
+        self.rows = None
+        self.stable_since = None
+
+    def check(self, driver):
+        now = time.time()
+        try:
+            tables, rows = driver.execute_script(COUNT_ROWS_SCRIPT, self.table_xpath)
+        except Exception as e:
+            # The SPA may be mid-navigation; treat as "not there yet"
+            logger.debug(f"Readiness probe failed: {e}")
+            tables, rows = 0, 0
+
+        if not tables or rows < self.min_rows:
+            self.rows = None
+            self.stable_since = None
+            return False
+        if rows != self.rows:
+            self.rows = rows
+            self.stable_since = now
+            return False
+        return now - self.stable_since >= self.stable_for
+
+
+def wait_for_table_ready(driver, table_xpath, timeout=PAGE_READY_TIMEOUT,
+                         stable_for=PAGE_READY_STABLE_SECONDS, min_rows=2):
+    """
+    Wait until a table matching `table_xpath` exists and its row count has been
+    unchanged for `stable_for` seconds. `timeout` is a hard ceiling.
+    Returns (ready, waited_seconds).
+    """
+    started = time.time()
+    probe = TableReadinessProbe(table_xpath, stable_for, min_rows)
+
+    while True:
+        ready = probe.check(driver)
+        waited = time.time() - started
+        if ready:
+            logger.info(f"✅ Table ready after {waited:.2f}s ({probe.rows} rows)")
+            return True, waited
+        if waited >= timeout:
+            logger.warning(f"⚠️ Table not ready after {waited:.2f}s (ceiling {timeout}s)")
+            return False, waited
+        time.sleep(PAGE_READY_POLL_INTERVAL)
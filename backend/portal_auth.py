@@ -0,0 +1,116 @@
+"""
+Authentication strategies for the Academia portal.
+
+The cheapest way to get an authenticated cookie jar is a single POST to
+/accounts/signin.ac (as api/token_srm.getToken does). The resulting jar
+works for both the HTTP engine and a browser (cookies are injected), so the
+Selenium iframe login is only needed when the portal demands interaction
+(captcha, extra verification, or an unexpected response).
+
+Outcomes and latency of every strategy are recorded in login_strategy_stats.
+"""
+import os
+import logging
+import threading
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ====== URLs and Constants ======
+BASE_URL = "https://academia.srmist.edu.in"
+SIGNIN_URL = BASE_URL + "/accounts/signin.ac"
+PORTAL_ID = os.getenv("ACADEMIA_PORTAL_ID", "10002227248")
+HTTP_LOGIN_ENABLED = os.getenv("HTTP_LOGIN_ENABLED", "true").lower() == "true"
+HTTP_LOGIN_TIMEOUT = float(os.getenv("HTTP_LOGIN_TIMEOUT", "15"))
+
+HEADERS = {
+    "Origin": BASE_URL,
+    "Referer": BASE_URL + "/",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+# Messages that mean the credentials themselves were rejected; a browser won't do better
+CREDENTIAL_ERRORS = ("invalid password", "incorrect password", "user does not exist", "invalid username")
+
+login_strategy_stats = {
+    strategy: {"attempts": 0, "successes": 0, "failures": 0, "total_seconds": 0.0}
+    for strategy in ("stored_session", "http", "selenium")
+}
+_stats_lock = threading.Lock()
+
+
+class InteractionRequired(Exception):
+    """The portal wants a real browser (captcha, verification step or unexpected response)"""
+
+
+class InvalidCredentials(Exception):
+    """The portal rejected the email/password"""
+
+
+def record_login_outcome(strategy, success, seconds):
+    with _stats_lock:
+        stats = login_strategy_stats[strategy]
+        stats["attempts"] += 1
+        stats["successes" if success else "failures"] += 1
+        stats["total_seconds"] += seconds
+    logger.info(f"Login strategy '{strategy}': {'success' if success else 'failure'} in {seconds:.2f}s")
+
+
+def get_login_stats():
+    with _stats_lock:
+        result = {}
+        for strategy, stats in login_strategy_stats.items():
+            avg = stats["total_seconds"] / stats["attempts"] if stats["attempts"] else None
+            result[strategy] = dict(stats, total_seconds=round(stats["total_seconds"], 3),
+                                    avg_seconds=round(avg, 3) if avg is not None else None)
+        return result
+
+
+def signin_payload(email, password):
+    """Form body for signin.ac (same fields as api/token_srm.getToken)"""
+    return {
+        "username": email,
+        "password": password,
+        "client_portal": "true",
+        "portal": PORTAL_ID,
+        "is_ajax": "true",
+        "grant_type": "password"
+    }
+
+
+def check_signin_response(data):
+    """Raise InvalidCredentials or InteractionRequired when signin.ac reports an error"""
+    if "error" in data:
+        error = data["error"]
+        message = error.get("msg", "Login failed") if isinstance(error, dict) else str(error)
+        if any(text in message.lower() for text in CREDENTIAL_ERRORS):
+            raise InvalidCredentials(message)
+        raise InteractionRequired(message)
+
+
+def http_login(email, password, session=None):
+    """
+    Sign in with one POST to signin.ac and return the session cookie jar as {name: value}.
+    Raises InvalidCredentials or InteractionRequired.
+    """
+    session = session or requests.Session()
+    try:
+        response = session.post(SIGNIN_URL, data=signin_payload(email, password), headers=HEADERS, timeout=HTTP_LOGIN_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RequestException as e:
+        raise InteractionRequired(f"signin.ac request failed: {e}")
+    except ValueError:
+        raise InteractionRequired("signin.ac did not return JSON")
+    check_signin_response(data)
+
+    # Visit the portal once so the app-level session cookies are issued too
+    try:
+        session.get(BASE_URL, headers=HEADERS, timeout=HTTP_LOGIN_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"⚠️ Portal visit after HTTP login failed: {e}")
+
+    cookies = session.cookies.get_dict()
+    if not cookies:
+        raise InteractionRequired("signin.ac succeeded but issued no cookies")
+    return cookies
@@ -12,7 +12,7 @@ from bs4 import BeautifulSoup
 from supabase import create_client, Client
 from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_provisioning import launch_chrome
 import traceback
 # import tensorflow.lite as tflite
 
@@ -50,70 +50,10 @@ def setup_driver():
     chrome_options.add_argument("--disable-extensions")
     chrome_options.add_argument("--remote-debugging-port=9222")
     
-    try:
-        # Try direct approach first
-        print("Attempting to initialize Chrome driver directly...")
-        driver = webdriver.Chrome(options=chrome_options)
-        print("✅ Chrome driver successfully initialized directly")
-        return driver
-    except Exception as e1:
-        print(f"⚠️ Direct initialization failed: {e1}")
-        time.sleep(3)  # Add small delay between attempts
-        
-        try:
-            # Try with webdriver-manager
-            print("Attempting to initialize Chrome driver with webdriver-manager...")
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            
-            try:
-                # Try getting the path or directly installing
-                chrome_driver_path = ChromeDriverManager().install()
-                service = Service(executable_path=chrome_driver_path)
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("✅ Chrome driver successfully initialized with webdriver-manager")
-                return driver
-            except Exception as e:
-                print(f"⚠️ Failed to use install() method: {e}")
-                # Fallback to manual location
-                chrome_driver_path = "/opt/render/.local/share/webdriver/chromedriver"
-                if os.path.exists(chrome_driver_path):
-                    service = Service(executable_path=chrome_driver_path)
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                    print("✅ Chrome driver successfully initialized with manual path")
-                    return driver
-                else:
-                    raise Exception("ChromeDriver not found at expected path")
-                
-        except Exception as e2:
-            print(f"⚠️ Webdriver-manager initialization failed: {e2}")
-            time.sleep(1)  # Add small delay between attempts
-            
-            try:
-                # Final attempt with undetected_chromedriver
-                print("Attempting to initialize with undetected_chromedriver...")
-                import undetected_chromedriver as uc
-                
-                # Set environment variables to debug undetected_chromedriver
-                os.environ['UC_LOG_LEVEL'] = 'DEBUG'
-                
-                # Make more resilient
-                for attempt in range(3):
-                    try:
-                        driver = uc.Chrome(headless=True, options=chrome_options)
-                        print("✅ Chrome driver successfully initialized with undetected_chromedriver")
-                        return driver
-                    except Exception as retry_error:
-                        print(f"⚠️ undetected_chromedriver attempt {attempt+1} failed: {retry_error}")
-                        time.sleep(2)  # Wait a bit before retrying
-                        
-                # If we're here, all retry attempts failed
-                raise Exception("All undetected_chromedriver attempts failed")
-                
-            except Exception as e3:
-                print(f"❌ All initialization methods failed: {e3}")
-                print("Please make sure Chrome is installed on this system.")
-                raise Exception("Failed to initialize Chrome driver after multiple attempts")
+    # Goes straight to the strategy that worked last time on this host
+    driver = launch_chrome(chrome_options)
+    print("✅ Chrome driver successfully initialized")
+    return driver
 
 # Global variables for credentials (will be overwritten in run_scraper)
 username = ""
@@ -0,0 +1,227 @@
+"""
+Scrape job registry.
+
+Replaces the bare active_scrapers dict. Every scrape is a job with an ID,
+a state machine (queued -> running [phase] -> done | failed) and
+timestamps. A job covers one or more parts ("attendance", "timetable"); a
+unified first-login job covers both, and each part finishes with its own
+outcome.
+
+Requests are coalesced: asking for a scrape while an in-flight job for the
+same user already covers it attaches to that job instead of starting
+another Chrome.
+"""
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime
+
+from admission import PRIORITY_CLASSES, USER
+
+logger = logging.getLogger(__name__)
+
+# ====== Job Registry Configuration ======
+JOB_RETENTION_SECONDS = float(os.getenv("SCRAPE_JOB_RETENTION_SECONDS", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Which parts each kind of scrape produces
+JOB_PARTS = {
+    "attendance": ("attendance",),
+    "timetable": ("timetable",),
+    "unified": ("attendance", "timetable")
+}
+
+# Status words the frontend already understands
+LEGACY_STATUS = {QUEUED: "waiting", RUNNING: "running", DONE: "completed", FAILED: "failed"}
+
+
+def utc_now():
+    return datetime.utcnow().isoformat()
+
+
+class ScrapeJob:
+    """One scrape for one user, possibly covering several parts"""
+    def __init__(self, email, kind, priority=USER):
+        self.id = uuid.uuid4().hex
+        self.email = email
+        self.kind = kind
+        self.priority = priority
+        self.parts = JOB_PARTS[kind]
+        self.state = QUEUED
+        self.phase = None
+        self.part_states = {part: QUEUED for part in self.parts}
+        self.part_results = {}
+        self.extra = {}
+        self.error = None
+        self.queue_position = None
+        self.attached = 0
+        self.created_at = utc_now()
+        self.started_at = None
+        self.finished_at = None
+        self.updated_at = self.created_at
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "state": self.state,
+            "phase": self.phase,
+            "queue_position": self.queue_position,
+            "parts": dict(self.part_states),
+            "error": self.error,
+            "attached_requests": self.attached,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "updated_at": self.updated_at
+        }
+
+
+class JobRegistry:
+    """Thread-safe registry of scrape jobs with per-user request coalescing"""
+    def __init__(self, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, email, kind, start, priority=USER):
+        """
+        Register a scrape and call start(job) to launch it, unless an in-flight job
+        for this user already covers `kind`. Returns (job, created).
+        """
+        wanted = set(JOB_PARTS[kind])
+        with self._lock:
+            self._prune()
+            for job in self.jobs.values():
+                if job.email == email and job.active and wanted <= set(job.parts):
+                    job.attached += 1
+                    # A more urgent request promotes the job it attaches to
+                    if PRIORITY_CLASSES.index(priority) < PRIORITY_CLASSES.index(job.priority):
+                        job.priority = priority
+                    logger.info(f"Coalesced {kind} request for {email} into job {job.id} ({job.state})")
+                    return job, False
+            job = ScrapeJob(email, kind, priority)
+            self.jobs[job.id] = job
+        logger.info(f"Created {kind} job {job.id} for {email} ({priority})")
+        try:
+            start(job)
+        except Exception as e:
+            self.finish(job, False, error=str(e))
+        return job, True
+
+    def record(self, email, kind, **extra):
+        """Register a request that was answered without scraping as an already completed job"""
+        job = ScrapeJob(email, kind)
+        with self._lock:
+            self._prune()
+            for part in job.parts:
+                job.part_states[part] = DONE
+            job.extra.update(extra)
+            job.started_at = job.created_at
+            self._close(job)
+            self.jobs[job.id] = job
+        return job
+
+    def start(self, job, phase=None):
+        with self._lock:
+            job.state = RUNNING
+            job.queue_position = None
+            job.started_at = job.started_at or utc_now()
+            job.updated_at = utc_now()
+            job.phase = phase
+            for part, state in job.part_states.items():
+                if state == QUEUED:
+                    job.part_states[part] = RUNNING
+
+    def set_queue_position(self, job, position):
+        """Record where the job waits in the browser admission queue"""
+        with self._lock:
+            job.queue_position = position
+            job.phase = f"queued #{position}"
+            job.updated_at = utc_now()
+
+    def set_phase(self, job, phase):
+        with self._lock:
+            job.phase = phase
+            job.updated_at = utc_now()
+
+    def finish_part(self, job, part, ok, result=None):
+        """Record the outcome of one part; the job finishes once every part has"""
+        with self._lock:
+            job.part_states[part] = DONE if ok else FAILED
+            if result is not None:
+                job.part_results[part] = result
+            job.updated_at = utc_now()
+            if all(state in (DONE, FAILED) for state in job.part_states.values()):
+                self._close(job)
+
+    def finish(self, job, ok, error=None, **extra):
+        """Finish every part that is still open with the same outcome"""
+        with self._lock:
+            for part, state in job.part_states.items():
+                if state in ACTIVE_STATES:
+                    job.part_states[part] = DONE if ok else FAILED
+            job.error = error or job.error
+            job.extra.update(extra)
+            self._close(job)
+
+    def _close(self, job):
+        job.state = DONE if all(state == DONE for state in job.part_states.values()) else FAILED
+        job.phase = None
+        job.finished_at = job.updated_at = utc_now()
+        logger.info(f"Job {job.id} ({job.kind}) for {job.email} finished: {job.part_states}")
+
+    def _prune(self):
+        now = datetime.utcnow()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and (now - datetime.fromisoformat(job.finished_at)).total_seconds() > self.retention_seconds:
+                del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def latest(self, email, part):
+        """Most recent job for this user that covers `part`"""
+        with self._lock:
+            candidates = [job for job in self.jobs.values() if job.email == email and part in job.parts]
+            return max(candidates, key=lambda job: job.created_at) if candidates else None
+
+    def status(self, email, part):
+        """Status of a user's latest `part` scrape in the shape the API has always returned"""
+        job = self.latest(email, part)
+        if not job:
+            return {"status": "not_started"}
+        with self._lock:
+            state = job.part_states[part]
+            status = {
+                "status": LEGACY_STATUS[state],
+                "state": state,
+                "phase": job.phase,
+                "queue_position": job.queue_position,
+                "job_id": job.id,
+                "started_at": job.started_at,
+                "updated_at": job.updated_at
+            }
+            if part in job.part_results:
+                status["result"] = job.part_results[part]
+            if job.error:
+                status["error"] = job.error
+            status.update(job.extra)
+            return status
+
+    def get_stats(self):
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, DONE, FAILED)}
+            for job in self.jobs.values():
+                counts[job.state] += 1
+            counts["coalesced"] = sum(job.attached for job in self.jobs.values())
+            return counts
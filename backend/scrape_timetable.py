@@ -13,8 +13,9 @@ from bs4 import BeautifulSoup
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from werkzeug.security import generate_password_hash  # Imported for user creation if needed
-from webdriver_manager.chrome import ChromeDriverManager
+from driver_provisioning import launch_chrome
 import traceback 
+from page_ready import wait_for_table_ready, TIMETABLE_TABLE_XPATH
 
 
 # Load environment variables from .env file
@@ -233,7 +234,9 @@ def scrape_timetable(driver):
     """
     logger.info(f"Navigating to timetable page: {TIMETABLE_URL}")
     driver.get(TIMETABLE_URL)
-    time.sleep(50)  # Wait for the page to load
+    # Wait for the course table to render instead of a fixed 50s sleep
+    ready, waited = wait_for_table_ready(driver, TIMETABLE_TABLE_XPATH, timeout=50)
+    logger.info(f"Timetable page {'ready' if ready else 'not ready'} after {waited:.2f}s")
 
     max_retries = 3
     extracted_rows = []
@@ -302,7 +305,7 @@ def scrape_timetable(driver):
             except Exception as e:
                 logger.warning(f"Error parsing table on attempt {attempt+1}: {e}")
 
-        time.sleep(5)
+        wait_for_table_ready(driver, TIMETABLE_TABLE_XPATH, timeout=5)
 
     if not extracted_rows:
         logger.error("Failed to extract timetable table after retries.")
@@ -670,70 +673,10 @@ def setup_driver():
     # Limit memory use explicitly 
     chrome_options.add_argument("--js-flags=--max-old-space-size=128")
     
-    try:
-        # Try direct approach first
-        print("Attempting to initialize Chrome driver directly...")
-        driver = webdriver.Chrome(options=chrome_options)
-        print("✅ Chrome driver successfully initialized directly")
-        return driver
-    except Exception as e1:
-        print(f"⚠️ Direct initialization failed: {e1}")
-        time.sleep(3)  # Add small delay between attempts
-        
-        try:
-            # Try with webdriver-manager
-            print("Attempting to initialize Chrome driver with webdriver-manager...")
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            
-            try:
-                # Try getting the path or directly installing
-                chrome_driver_path = ChromeDriverManager().install()
-                service = Service(executable_path=chrome_driver_path)
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("✅ Chrome driver successfully initialized with webdriver-manager")
-                return driver
-            except Exception as e:
-                print(f"⚠️ Failed to use install() method: {e}")
-                # Fallback to manual location
-                chrome_driver_path = "/opt/render/.local/share/webdriver/chromedriver"
-                if os.path.exists(chrome_driver_path):
-                    service = Service(executable_path=chrome_driver_path)
-                    driver = webdriver.Chrome(service=service, options=chrome_options)
-                    print("✅ Chrome driver successfully initialized with manual path")
-                    return driver
-                else:
-                    raise Exception("ChromeDriver not found at expected path")
-                
-        except Exception as e2:
-            print(f"⚠️ Webdriver-manager initialization failed: {e2}")
-            time.sleep(1)  # Add small delay between attempts
-            
-            try:
-                # Final attempt with undetected_chromedriver
-                print("Attempting to initialize with undetected_chromedriver...")
-                import undetected_chromedriver as uc
-                
-                # Set environment variables to debug undetected_chromedriver
-                os.environ['UC_LOG_LEVEL'] = 'DEBUG'
-                
-                # Make more resilient
-                for attempt in range(3):
-                    try:
-                        driver = uc.Chrome(headless=True, options=chrome_options)
-                        print("✅ Chrome driver successfully initialized with undetected_chromedriver")
-                        return driver
-                    except Exception as retry_error:
-                        print(f"⚠️ undetected_chromedriver attempt {attempt+1} failed: {retry_error}")
-                        time.sleep(2)  # Wait a bit before retrying
-                        
-                # If we're here, all retry attempts failed
-                raise Exception("All undetected_chromedriver attempts failed")
-                
-            except Exception as e3:
-                print(f"❌ All initialization methods failed: {e3}")
-                print("Please make sure Chrome is installed on this system.")
-                raise Exception("Failed to initialize Chrome driver after multiple attempts")
+    # Goes straight to the strategy that worked last time on this host
+    driver = launch_chrome(chrome_options)
+    print("✅ Chrome driver successfully initialized")
+    return driver
 
 def main_flow(username, password, driver_path=None):
     """
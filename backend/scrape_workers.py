@@ -0,0 +1,269 @@
+"""
+Isolated scrape worker processes.
+
+Scrapes used to run as daemon threads inside the gunicorn worker that also
+serves API reads, so a Chrome hang, a memory spike or a long BeautifulSoup
+parse slowed every request. Here each scrape runs in one of SCRAPE_WORKERS
+long-lived worker processes (which keep their own warm driver pool). The
+API side only waits on a pipe for the result. A job that overruns
+SCRAPE_JOB_TIMEOUT has its worker and the worker's Chrome tree killed, and
+a fresh worker takes its place.
+
+Browserless refreshes send their parse-and-save step here too
+(run_page_save), so the async engine only does network I/O in the API
+process. Those saves run on PAGE_SAVE_WORKERS processes of their own,
+which never hold a browser, so a save never queues behind a browser scrape;
+PAGE_SAVE_TIMEOUT covers the wait for one of them as well as the save. Warm Chromes in workers are held outside admission control, so the
+workers' driver pools are sized to fit MAX_BROWSER_SESSIONS between them.
+"""
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+
+from admission import MAX_BROWSER_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+# ====== Worker Configuration ======
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", str(MAX_BROWSER_SESSIONS)))
+SCRAPE_JOB_TIMEOUT = float(os.getenv("SCRAPE_JOB_TIMEOUT", "240"))
+PAGE_SAVE_WORKERS = int(os.getenv("PAGE_SAVE_WORKERS", "1"))
+PAGE_SAVE_TIMEOUT = float(os.getenv("PAGE_SAVE_TIMEOUT", "60"))
+SCRAPE_WORKER_START_METHOD = os.getenv("SCRAPE_WORKER_START_METHOD", "spawn")
+
+
+def worker_driver_pool_size(workers):
+    """Warm drivers each worker may keep, so idle Chromes across workers never exceed the admission slots"""
+    from driver_pool import DRIVER_POOL_SIZE
+    return min(DRIVER_POOL_SIZE, MAX_BROWSER_SESSIONS // max(workers, 1))
+
+
+def worker_main(conn, driver_pool_size):
+    """Worker process loop: run scrape jobs sent over the pipe until told to stop"""
+    import srm_scrapper
+    srm_scrapper.driver_pool.size = driver_pool_size
+    if driver_pool_size and os.getenv("DRIVER_POOL_PREWARM", "false").lower() == "true":
+        srm_scrapper.driver_pool.warm()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        try:
+            if job["scraper_type"] == "attendance_page":
+                scraper = srm_scrapper.SRMScraper(job["email"], job["password"])
+                result = scraper.save_attendance_page(job["html_source"])
+            else:
+                result = srm_scrapper.run_scraper(job["email"], job["password"], scraper_type=job["scraper_type"],
+                                                  http_first=job["http_first"])
+            conn.send({"ok": True, "result": result})
+        except Exception as e:
+            conn.send({"ok": False, "error": str(e)})
+
+
+def kill_process_tree(pid):
+    """Kill a worker and everything it started (chromedriver, Chrome)"""
+    try:
+        import psutil
+        root = psutil.Process(pid)
+        processes = root.children(recursive=True) + [root]
+    except Exception:
+        processes = []
+    for proc in processes:
+        try:
+            proc.kill()
+        except Exception:
+            continue
+
+
+class ScrapeWorker:
+    """One long-lived scrape process, replaced when a job overruns or crashes it"""
+    def __init__(self, context, index, driver_pool_size):
+        self.context = context
+        self.index = index
+        self.driver_pool_size = driver_pool_size
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.start()
+
+    def start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=worker_main, args=(child_conn, self.driver_pool_size), name=f"scrape-worker-{self.index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        logger.info(f"✅ Started scrape worker {self.index} (pid {self.process.pid})")
+
+    def restart(self):
+        kill_process_tree(self.process.pid)
+        self.process.join(timeout=5)
+        self.conn.close()
+        self.start()
+
+    def ensure_alive(self):
+        """Replace the process if it died while idle (OOM kill, Chrome taking it down)"""
+        if not self.process.is_alive():
+            logger.error(f"❌ Scrape worker {self.index} died while idle (exit code {self.process.exitcode}); restarting it")
+            self.restart()
+
+    def run(self, job, timeout):
+        """Send one job and wait for its result; kills and replaces the worker on overrun"""
+        self.jobs += 1
+        self.ensure_alive()
+        try:
+            self.conn.send(job)
+        except OSError:
+            logger.error(f"❌ Scrape worker {self.index} could not take a job; restarting it")
+            self.restart()
+            raise RuntimeError("Scrape worker crashed")
+        if not self.conn.poll(timeout):
+            logger.error(f"❌ Scrape job for {job['email']} exceeded {timeout:.0f}s; killing worker {self.index}")
+            self.restart()
+            raise TimeoutError(f"Scrape timed out after {timeout:.0f}s")
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            logger.error(f"❌ Scrape worker {self.index} died during a job; restarting it")
+            self.restart()
+            raise RuntimeError("Scrape worker crashed")
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        if self.process.is_alive():
+            kill_process_tree(self.process.pid)
+
+
+class ScrapeWorkerPool:
+    """
+    A fixed set of scrape processes; callers block until a worker is free.
+    Page saves use their own page_workers when there are any, so they never wait behind a scrape.
+    """
+    def __init__(self, size=SCRAPE_WORKERS, timeout=SCRAPE_JOB_TIMEOUT, start_method=SCRAPE_WORKER_START_METHOD,
+                 page_workers=PAGE_SAVE_WORKERS):
+        self.size = size
+        self.page_workers = max(0, page_workers)
+        self.timeout = timeout
+        self.context = multiprocessing.get_context(start_method)
+        self.driver_pool_size = worker_driver_pool_size(size)
+        if self.driver_pool_size == 0:
+            logger.warning(f"⚠️ {size} scrape workers exceed {MAX_BROWSER_SESSIONS} browser slots; workers won't keep warm drivers")
+        self.workers = [ScrapeWorker(self.context, i, self.driver_pool_size) for i in range(size)]
+        # Page-save workers never lease a browser, so they keep no drivers
+        self.workers += [ScrapeWorker(self.context, size + i, 0) for i in range(self.page_workers)]
+        self.idle = queue.Queue()
+        self.page_idle = queue.Queue() if self.page_workers else self.idle
+        for worker in self.workers:
+            (self.page_idle if worker.index >= size else self.idle).put(worker)
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "completed": 0, "failed": 0, "timeouts": 0, "crashes": 0, "no_free_worker": 0,
+                      "total_seconds": 0.0}
+
+    def _count(self, key, seconds=None):
+        with self._lock:
+            self.stats[key] += 1
+            if seconds is not None:
+                self.stats["total_seconds"] += seconds
+
+    def run(self, email, password, scraper_type="attendance", timeout=None, html_source=None, wait=None, http_first=True):
+        """
+        Run a scrape (or, for "attendance_page", the save of a fetched page) in a worker process.
+        With `wait`, give up when no worker frees up within that many seconds; time spent
+        waiting then also counts against `timeout`.
+        """
+        timeout = timeout or self.timeout
+        self._count("jobs")
+        job = {"email": email, "password": password, "scraper_type": scraper_type, "html_source": html_source,
+               "http_first": http_first}
+        idle = self.page_idle if scraper_type == "attendance_page" else self.idle
+        requested = time.time()
+        try:
+            worker = idle.get(timeout=wait)
+        except queue.Empty:
+            self._count("no_free_worker")
+            return {"status": "error", "message": f"No scrape worker free within {wait:.0f}s"}
+        started = time.time()
+        if wait is not None:
+            timeout = max(1.0, timeout - (started - requested))
+        try:
+            reply = worker.run(job, timeout)
+        except TimeoutError as e:
+            self._count("timeouts", time.time() - started)
+            return {"status": "error", "message": str(e)}
+        except RuntimeError as e:
+            self._count("crashes", time.time() - started)
+            return {"status": "error", "message": str(e)}
+        finally:
+            try:
+                worker.ensure_alive()
+            except Exception as e:
+                # Still handed back: run() checks again before the next job
+                logger.error(f"❌ Could not restart scrape worker {worker.index}: {e}")
+            idle.put(worker)
+
+        if not reply["ok"]:
+            self._count("failed", time.time() - started)
+            return {"status": "error", "message": reply["error"]}
+        self._count("completed", time.time() - started)
+        return reply["result"]
+
+    def get_stats(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                total_seconds=round(self.stats["total_seconds"], 2),
+                size=self.size,
+                page_workers=self.page_workers,
+                driver_pool_size=self.driver_pool_size,
+                busy=len(self.workers) - self.idle.qsize() - (self.page_idle.qsize() if self.page_workers else 0),
+                pids=[worker.process.pid for worker in self.workers]
+            )
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """The process-wide worker pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ScrapeWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def run_scrape_job(email, password, scraper_type="attendance", http_first=True):
+    """Run a scrape in an isolated worker process, or inline when SCRAPE_WORKERS is 0"""
+    if SCRAPE_WORKERS <= 0:
+        import srm_scrapper
+        return srm_scrapper.run_scraper(email, password, scraper_type=scraper_type, http_first=http_first)
+    return get_worker_pool().run(email, password, scraper_type, http_first=http_first)
+
+
+def run_page_save(email, password, html_source):
+    """
+    Parse a fetched attendance page and save it in a worker process (inline when
+    SCRAPE_WORKERS is 0). Returns save_attendance_page's result.
+    """
+    if SCRAPE_WORKERS <= 0:
+        import srm_scrapper
+        return srm_scrapper.SRMScraper(email, password).save_attendance_page(html_source)
+    return get_worker_pool().run(email, password, "attendance_page", timeout=PAGE_SAVE_TIMEOUT,
+                                 html_source=html_source, wait=PAGE_SAVE_TIMEOUT)
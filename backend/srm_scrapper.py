@@ -2,22 +2,31 @@ import time
 import json
 import os
 import re
+import hashlib
 import logging
 import traceback
 import sys
-from selenium import webdriver
+import atexit
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from supabase import create_client, Client
 from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
-from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime, timedelta
 import jwt
+from driver_pool import DriverPool
+from http_scraper import HttpScraper, SessionExpired, HTTP_SCRAPER_ENABLED, ATTENDANCE_PAGE_NAME, TIMETABLE_PAGE_NAME
+from portal_auth import http_login, record_login_outcome, InteractionRequired, InvalidCredentials, HTTP_LOGIN_ENABLED
+from memory_watchdog import MemoryWatchdog, driver_process_tree_rss_mb, python_rss_mb
+from driver_provisioning import launch_chrome
+import network_profile
+from network_profile import NETWORK_PROFILE_ENABLED, NetworkStats
+from page_capture import PageCapture
+import dom_extract
+from html_parsing import PARSER_BACKEND, ParsedDocument, SELECTOLAX_FIELDS, make_soup, parse_tree
+from page_ready import wait_for_table_ready, TableReadinessProbe, PAGE_READY_TIMEOUT, PAGE_READY_POLL_INTERVAL, ATTENDANCE_TABLE_XPATH, TIMETABLE_TABLE_XPATH
 
 # Load environment variables from .env file
 load_dotenv()
@@ -52,6 +61,43 @@ LOGIN_URL = BASE_URL
 ATTENDANCE_PAGE_URL = BASE_URL + "/#Page:My_Attendance"
 TIMETABLE_URL = BASE_URL + "/#Page:My_Time_Table_2023_24"
 
+# Load the attendance and timetable pages in parallel tabs during unified scrapes
+PARALLEL_TABS = os.getenv("SCRAPER_PARALLEL_TABS", "true").lower() == "true"
+
+# ====== Session Reuse ======
+# Seconds to wait for the dashboard when probing a resumed session
+SESSION_PROBE_TIMEOUT = int(os.getenv("SESSION_PROBE_TIMEOUT", "8"))
+
+# A user whose stored sessions are skipped as too old is still probed after this many skips in a row
+SESSION_REPROBE_EVERY = int(os.getenv("SESSION_REPROBE_EVERY", "3"))
+
+# Observed lifetime of stored portal cookies, learned from resume attempts (process-wide, for metrics)
+session_lifetime_stats = {
+    "resumed": 0,
+    "expired": 0,
+    "skipped": 0,
+    "longest_valid_seconds": 0,
+    "shortest_expired_seconds": None
+}
+
+# The same observations per user; only these decide whether a resume is worth probing,
+# so one user's early expiry (e.g. a portal logout) can't cap session reuse for everyone
+user_session_lifetimes = {}
+
+# ====== Change Detection ======
+def content_hash(payload):
+    """Hash of a parsed dataset in canonical JSON form, ignoring when it was scraped"""
+    canonical = {key: value for key, value in payload.items() if key != "last_updated"}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+def registration_fingerprint(attendance_records):
+    """
+    Hash of the course registration (course codes, categories and slots) as listed on the
+    attendance page. The timetable only needs re-scraping when this changes.
+    """
+    courses = sorted({(rec["course_code"], rec["category"], rec["slot"]) for rec in attendance_records})
+    return hashlib.sha256(json.dumps(courses, separators=(",", ":")).encode()).hexdigest()
+
 # Time slots mapping (for display only)
 slot_times = {
     "1": "08:00-08:50",
@@ -125,125 +171,272 @@ batch_2_timetable = {
     }
 }
 
+def build_chrome_options(block_resources=NETWORK_PROFILE_ENABLED):
+    """Chrome options tuned for Render's free tier"""
+    chrome_options = Options()
+    # Essential flags for Render's free tier
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+
+    # Memory optimization flags (critical for Render free tier)
+    chrome_options.add_argument('--disable-renderer-backgrounding')
+    chrome_options.add_argument('--disable-background-timer-throttling')
+    chrome_options.add_argument('--disable-backgrounding-occluded-windows')
+    chrome_options.add_argument('--disable-client-side-phishing-detection')
+    chrome_options.add_argument('--memory-pressure-off')
+    chrome_options.add_argument('--single-process')  # Important for limiting memory usage
+
+    # Basic optimization flags
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--disable-extensions')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_argument('--disable-notifications')
+    chrome_options.add_argument('--disable-popup-blocking')
+    chrome_options.add_argument('--start-maximized')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    if block_resources:
+        network_profile.apply_to_options(chrome_options)
+
+    return chrome_options
+
+def create_chrome_driver(block_resources=NETWORK_PROFILE_ENABLED):
+    """Launch a new Chrome driver, optionally with the resource-blocking network profile"""
+    logger.info("Setting up Chrome driver...")
+    driver = launch_chrome(build_chrome_options(block_resources))
+    if block_resources:
+        try:
+            network_profile.enable(driver)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not enable resource blocking: {e}")
+    return driver
+
+driver_pool = DriverPool(create_chrome_driver)
+atexit.register(driver_pool.shutdown)
+
 class SRMScraper:
     """
     Unified scraper for SRM Academia portal data.
     Handles both timetable and attendance scraping with a single browser session.
     """
-    def __init__(self, email, password):
+    def __init__(self, email, password, pool=None):
         self.driver = None
         self.is_logged_in = False
         self.email = email
         self.password = password
+        self.pool = pool or driver_pool
+        self.login_timings = {}
+        self.page_wait_times = {}
+        self.network_stats = None
+        self.watchdog = None
+        self.credentials_rejected = False
+        self.http_login_result = None
+        self.http_login_attempted = False
+        self.resumed_cookies = None
+        self.capture = PageCapture()
+        self.document = None
+        self.user_ids = {}
+        self.changes = {}
+        self.registration_fingerprint = None
 
     def setup_driver(self):
         """Initialize Chrome driver with appropriate options for Render deployment"""
-        logger.info("Setting up Chrome driver...")
-
-        chrome_options = Options()
-        # Essential flags for Render's free tier
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-
-        # Memory optimization flags (critical for Render free tier)
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-client-side-phishing-detection')
-        chrome_options.add_argument('--memory-pressure-off')
-        chrome_options.add_argument('--single-process')  # Important for limiting memory usage
-        chrome_options.add_argument('--remote-debugging-port=9222')  # Enable debugging
-
-        # Basic optimization flags
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument('--disable-popup-blocking')
-        chrome_options.add_argument('--start-maximized')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-
-        try:
-            # Try direct approach first
-            logger.info("Attempting to initialize Chrome driver directly...")
-            self.driver = webdriver.Chrome(options=chrome_options)
-            logger.info("✅ Chrome driver successfully initialized directly")
-            return self.driver
-        except Exception as e1:
-            logger.warning(f"⚠️ Direct initialization failed: {e1}")
-            time.sleep(2)  # Small delay between attempts
-
-            try:
-                # Try with webdriver-manager
-                logger.info("Attempting to initialize Chrome driver with webdriver-manager...")
-                from selenium.webdriver.chrome.service import Service
-                from webdriver_manager.chrome import ChromeDriverManager
-
-                try:
-                    # Try getting the path or directly installing
-                    chrome_driver_path = ChromeDriverManager().install()
-                    service = Service(executable_path=chrome_driver_path)
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                    logger.info("✅ Chrome driver successfully initialized with webdriver-manager")
-                    return self.driver
-                except Exception as e:
-                    logger.warning(f"⚠️ Failed to use install() method: {e}")
-                    # Fallback to manual location
-                    chrome_driver_path = "/opt/render/.local/share/webdriver/chromedriver"
-                    if os.path.exists(chrome_driver_path):
-                        service = Service(executable_path=chrome_driver_path)
-                        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                        logger.info("✅ Chrome driver successfully initialized with manual path")
-                        return self.driver
-                    else:
-                        raise Exception("ChromeDriver not found at expected path")
+        self.driver = create_chrome_driver()
+        return self.driver
+
+    def lease_driver(self):
+        """Borrow a warm driver from the shared pool instead of launching Chrome"""
+        self.driver = self.pool.acquire()
+        self.watchdog = MemoryWatchdog(self.driver).start()
+        if NETWORK_PROFILE_ENABLED:
+            # Drop events left over from the driver's previous lease
+            network_profile.read_performance_log(self.driver)
+            self.network_stats = NetworkStats()
+        return self.driver
+
+    def collect_network_stats(self):
+        """Fold new performance-log events into this scrape's network counters"""
+        if not (NETWORK_PROFILE_ENABLED and self.driver and self.network_stats):
+            return None
+        self.network_stats.update(network_profile.read_performance_log(self.driver))
+        return self.network_stats.as_dict()
 
-            except Exception as e2:
-                logger.warning(f"⚠️ Webdriver-manager initialization failed: {e2}")
-                time.sleep(1)  # Small delay between attempts
+    def failure_message(self, error):
+        """Explain a scrape failure, naming the memory watchdog when it aborted the run"""
+        if self.watchdog and self.watchdog.tripped:
+            return f"Aborted: Chrome exceeded the {self.watchdog.ceiling_mb:.0f} MB memory ceiling"
+        return str(error)
 
-                try:
-                    # Final attempt with undetected_chromedriver
-                    logger.info("Attempting to initialize with undetected_chromedriver...")
-                    import undetected_chromedriver as uc
-
-                    # Set environment variables to debug undetected_chromedriver
-                    os.environ['UC_LOG_LEVEL'] = 'DEBUG'
-
-                    # Make more resilient
-                    for attempt in range(3):
-                        try:
-                            self.driver = uc.Chrome(headless=True, options=chrome_options)
-                            logger.info("✅ Chrome driver successfully initialized with undetected_chromedriver")
-                            return self.driver
-                        except Exception as retry_error:
-                            logger.warning(f"⚠️ undetected_chromedriver attempt {attempt+1} failed: {retry_error}")
-                            time.sleep(2)  # Wait a bit before retrying
-
-                    # If we're here, all retry attempts failed
-                    raise Exception("All undetected_chromedriver attempts failed")
-
-                except Exception as e3:
-                    logger.error(f"❌ All initialization methods failed: {e3}")
-                    logger.error("Please make sure Chrome is installed on this system.")
-                    raise Exception("Failed to initialize Chrome driver after multiple attempts")
+    def release_driver(self, discard=False):
+        """Hand the driver back to the pool (scrubbed), or have it recycled when discard is set"""
+        if self.driver:
+            if self.watchdog:
+                summary = self.watchdog.stop()
+                logger.info(f"Peak Chrome RSS during scrape: {summary['peak_chrome_rss_mb']} MB")
+                # A driver whose Chrome was killed for memory must not go back to the pool
+                discard = discard or summary["tripped"]
+                self.watchdog = None
+            stats = self.collect_network_stats()
+            if stats:
+                logger.info(
+                    f"Network: {stats['requests']} requests, {stats['blocked_requests']} blocked by URL pattern, "
+                    f"{stats['bytes_received'] / 1024:.0f} KB received"
+                )
+            logger.info(f"Page capture: {self.capture.summary()}")
+            self.pool.release(self.driver, discard=discard)
+        self.capture.clear()
+        self.document = None
+        self.driver = None
+        self.is_logged_in = False
 
     def ensure_login(self):
-        """Login if not already logged in, or reuse existing session"""
+        """
+        Login if not already logged in: stored session first, then a browserless
+        signin.ac login, and the Selenium form login only when the portal demands interaction
+        """
         # If already logged in, return True
         if self.is_logged_in:
             return True
 
         # Initialize driver if needed
         if not self.driver:
-            self.setup_driver()
+            self.lease_driver()
+
+        # Reuse the stored portal session when it is still valid
+        if self.resume_session():
+            self.is_logged_in = True
+            return True
+
+        # Log in over HTTP and hand the cookie jar to the browser; a jar resume_session
+        # just probed (e.g. one the HTTP path stored earlier in this scrape) isn't probed twice
+        cookies = self.authenticate_http()
+        if cookies and cookies != self.resumed_cookies and self.probe_cookies(cookies):
+            logger.info("✅ Browser session established from HTTP login")
+            self.is_logged_in = True
+            return True
+        if self.credentials_rejected:
+            return False
 
         # Perform login
-        return self.login()
+        started = time.time()
+        success = self.login()
+        record_login_outcome("selenium", success, time.time() - started)
+        return success
+
+    def parse_timestamp(self, value):
+        """Parse a stored ISO timestamp into a naive local datetime"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed
+
+    def load_stored_session(self):
+        """Fetch the cookie jar saved by the last successful login"""
+        try:
+            result = supabase.table('user_cookies').select('cookies, updated_at').eq('email', self.email).execute()
+            if result.data and result.data[0].get('cookies'):
+                return result.data[0]
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load stored session: {e}")
+        return None
+
+    def record_session_observation(self, age_seconds, valid):
+        """Track how long stored cookies stay valid and persist the last successful check"""
+        stats = session_lifetime_stats
+        lifetime = user_session_lifetimes.setdefault(
+            self.email, {"longest_valid_seconds": 0, "shortest_expired_seconds": None, "skipped": 0}
+        )
+        lifetime["skipped"] = 0
+        for observed in (stats, lifetime):
+            if valid:
+                observed["longest_valid_seconds"] = max(observed["longest_valid_seconds"], age_seconds)
+            elif observed["shortest_expired_seconds"] is None or age_seconds < observed["shortest_expired_seconds"]:
+                observed["shortest_expired_seconds"] = age_seconds
+        if valid:
+            stats["resumed"] += 1
+            try:
+                supabase.table('user_cookies').update({
+                    'last_valid_at': datetime.now().isoformat()
+                }).eq('email', self.email).execute()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to record session validity: {e}")
+        else:
+            stats["expired"] += 1
+        logger.info(
+            f"Session lifetime: {'valid' if valid else 'expired'} at {age_seconds / 3600:.1f}h "
+            f"(longest valid for this user {lifetime['longest_valid_seconds'] / 3600:.1f}h, "
+            f"resumed {stats['resumed']}, expired {stats['expired']})"
+        )
+
+    def inject_cookies(self, cookies):
+        """Load a {name: value} cookie jar into the browser without an extra page load"""
+        self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        for name, value in cookies.items():
+            self.driver.execute_cdp_cmd('Network.setCookie', {
+                'name': name,
+                'value': value,
+                'url': BASE_URL + "/",
+                'secure': True
+            })
+
+    def resume_session(self):
+        """
+        Try to skip the credential login by injecting the stored cookie jar and
+        probing the dashboard. Returns True when the session is still authenticated.
+        """
+        stored = self.load_stored_session()
+        if not stored:
+            return False
+
+        saved_at = self.parse_timestamp(stored.get('updated_at'))
+        age_seconds = (datetime.now() - saved_at).total_seconds() if saved_at else 0
+
+        # Don't bother probing a session older than any of this user's we've seen survive and older
+        # than one we've seen expire, but probe every SESSION_REPROBE_EVERY skips so the window can grow
+        lifetime = user_session_lifetimes.get(self.email)
+        if (lifetime and lifetime["shortest_expired_seconds"] is not None
+                and age_seconds > lifetime["shortest_expired_seconds"]
+                and age_seconds > lifetime["longest_valid_seconds"]
+                and lifetime["skipped"] < SESSION_REPROBE_EVERY):
+            lifetime["skipped"] += 1
+            session_lifetime_stats["skipped"] += 1
+            logger.info(f"Skipping session resume: stored cookies are {age_seconds / 3600:.1f}h old")
+            return False
+
+        started = time.time()
+        self.resumed_cookies = stored['cookies']
+        valid = self.probe_cookies(stored['cookies'])
+        record_login_outcome("stored_session", valid, time.time() - started)
+        self.record_session_observation(age_seconds, valid=valid)
+        if valid:
+            logger.info("✅ Resumed portal session from stored cookies")
+        return valid
+
+    def probe_cookies(self, cookies):
+        """Inject a cookie jar into the browser and check that it reaches the dashboard"""
+        try:
+            self.inject_cookies(cookies)
+            self.driver.get(BASE_URL)
+            WebDriverWait(self.driver, SESSION_PROBE_TIMEOUT).until(
+                EC.presence_of_element_located((By.XPATH, "//a[contains(@href, 'My_Attendance')]"))
+            )
+            return True
+        except Exception as e:
+            logger.info(f"Cookie session expired or invalid, falling back to login: {e}")
+            try:
+                self.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            except Exception:
+                pass
+            return False
 
     def create_jwt_token(self, email):
         """Create a JWT token with 30-day expiration"""
@@ -263,112 +456,174 @@ class SRMScraper:
             logger.error(f"❌ Failed to create JWT token: {e}")
             return None
 
-    def login(self):
-        """Log in to SRM Academia portal with enhanced retry logic for Render"""
+    def store_session_cookies(self, cookie_dict):
+        """Save a logged-in cookie jar and a fresh JWT to user_cookies, whichever strategy produced it"""
+        # Generate JWT token
+        token = self.create_jwt_token(self.email)
+        if not token:
+            raise Exception("Failed to generate JWT token")
+
+        # Save cookies and token to file for debugging
+        debug_data = {
+            'cookies': cookie_dict,
+            'token': token
+        }
+        with open('debug_cookies.json', 'w') as f:
+            json.dump(debug_data, f)
+        logger.info("✅ Saved cookies and token to debug file")
+
+        # Store cookies and token in Supabase
         try:
-            self.driver.get(LOGIN_URL)
-            wait = WebDriverWait(self.driver, 30)
+            cookie_data = {
+                'email': self.email,
+                'cookies': cookie_dict,
+                'token': token,
+                'updated_at': datetime.now().isoformat()
+            }
 
-            # Switch to iframe with retry
-            for attempt in range(3):
-                try:
-                    wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "signinFrame")))
-                    logger.info("Switched to login iframe")
-                    break
-                except Exception as e:
-                    logger.warning(f"⚠️ Attempt {attempt+1} to switch to iframe failed: {e}")
-                    if attempt == 2:  # Last attempt failed
-                        raise
-                    time.sleep(2)
+            # Delete old record first
+            supabase.table('user_cookies').delete().eq('email', self.email).execute()
+            logger.info("✅ Deleted old cookie record")
 
-            # Enter email with retry
-            for attempt in range(3):
-                try:
-                    email_field = wait.until(EC.presence_of_element_located((By.ID, "login_id")))
-                    email_field.clear()  # Clear first
-                    time.sleep(0.5)
-                    email_field.send_keys(self.email)
-                    logger.info(f"Entered email: {self.email}")
-                    break
-                except Exception as e:
-                    logger.warning(f"⚠️ Attempt {attempt+1} to enter email failed: {e}")
-                    if attempt == 2:  # Last attempt failed
-                        raise
-                    time.sleep(2)
+            # Insert new record
+            supabase.table('user_cookies').insert(cookie_data).execute()
+            logger.info("✅ Stored new cookie record with token")
 
-            # Click Next button with retry
-            for attempt in range(3):
-                try:
-                    next_btn = wait.until(EC.element_to_be_clickable((By.ID, "nextbtn")))
-                    self.driver.execute_script("arguments[0].click();", next_btn)  # JavaScript click
-                    logger.info("Clicked Next")
-                    break
-                except Exception as e:
-                    logger.warning(f"⚠️ Attempt {attempt+1} to click Next failed: {e}")
-                    if attempt == 2:  # Last attempt failed
-                        raise
-                    time.sleep(2)
+        except Exception as e:
+            logger.error(f"❌ Failed to store cookies and token in Supabase: {e}")
 
-            # ===== Critical Fix: Wait longer and switch iframe context if needed =====
-            # Wait longer for the page transition to complete
-            time.sleep(2)  # Increase from 2s to 5s
+    def authenticate_http(self):
+        """
+        Log in with a single signin.ac POST and store the resulting cookie jar.
+        Returns the jar, or None when the portal wants a browser (or HTTP login is off).
+        The POST is sent at most once per scrape; later calls return the first outcome.
+        """
+        if not (HTTP_LOGIN_ENABLED and self.password):
+            return None
+        if self.http_login_attempted:
+            return self.http_login_result
+        self.http_login_attempted = True
+        started = time.time()
+        try:
+            cookies = http_login(self.email, self.password)
+        except InvalidCredentials as e:
+            logger.error(f"❌ HTTP login rejected credentials: {e}")
+            record_login_outcome("http", False, time.time() - started)
+            self.credentials_rejected = True
+            return None
+        except InteractionRequired as e:
+            logger.info(f"HTTP login needs a browser, falling back to Selenium: {e}")
+            record_login_outcome("http", False, time.time() - started)
+            return None
+        elapsed = round(time.time() - started, 3)
+        record_login_outcome("http", True, elapsed)
+        self.login_timings = {"http_login": elapsed, "total": elapsed}
+        try:
+            self.store_session_cookies(cookies)
+        except Exception as e:
+            logger.error(f"❌ Failed to store cookies from HTTP login: {e}")
+        self.http_login_result = cookies
+        return cookies
 
-            # Check if we need to switch to iframe again
-            try:
-                # First check if we're already in the correct context
-                password_field = self.driver.find_element(By.ID, "password")
-            except:
-                # If not, try to switch back to default and then to iframe again
-                logger.info("Switching iframe context for password field")
-                self.driver.switch_to.default_content()
-                wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "signinFrame")))
+    def credentials_error(self):
+        """Result for a scrape whose password the portal rejected; retrying in a browser would only send it again"""
+        return {"status": "error", "message": "Portal rejected the credentials", "credentials_rejected": True}
 
-            # Enter password with retry - now with better iframe handling
-            for attempt in range(3):
-                try:
-                    # Wait explicitly for password field to be visible and interactable
-                    password_field = wait.until(
-                        EC.element_to_be_clickable((By.ID, "password"))
-                    )
-                    time.sleep(1)  # Small delay for stability
-                    password_field.clear()  # Clear first
-                    time.sleep(0.5)
-                    password_field.send_keys(self.password)
-                    logger.info("Entered password")
-                    break
-                except Exception as e:
-                    logger.warning(f"⚠️ Attempt {attempt+1} to enter password failed: {e}")
-                    if attempt == 2:  # Last attempt failed
-                        # Try one more approach - use JavaScript to set the value
-                        try:
-                            logger.info("Trying JavaScript approach to enter password")
-                            self.driver.execute_script(
-                                'document.getElementById("password").value = arguments[0]',
-                                self.password
-                            )
-                            logger.info("Entered password via JavaScript")
-                        except Exception as js_error:
-                            logger.error(f"JavaScript password entry also failed: {js_error}")
-                            raise
-                    time.sleep(2)  # Increased wait between attempts
-
-            # Click Sign In button with retry
-            for attempt in range(3):
+    def timed_login_step(self, name, action, attempts=3):
+        """Run one login step, retrying on failure, and record how long it took"""
+        started = time.time()
+        try:
+            for attempt in range(attempts):
                 try:
-                    sign_in_btn = wait.until(EC.element_to_be_clickable((By.ID, "nextbtn")))
-                    self.driver.execute_script("arguments[0].click();", sign_in_btn)  # JavaScript click
-                    logger.info("Clicked Sign In")
-                    break
+                    return action()
                 except Exception as e:
-                    logger.warning(f"⚠️ Attempt {attempt+1} to click Sign In failed: {e}")
-                    if attempt == 2:  # Last attempt failed
+                    logger.warning(f"⚠️ Attempt {attempt+1} to {name.replace('_', ' ')} failed: {e}")
+                    if attempt == attempts - 1:  # Last attempt failed
                         raise
-                    time.sleep(2)
+        finally:
+            self.login_timings[name] = round(time.time() - started, 3)
+
+    def password_field_ready(self, driver):
+        """Wait condition: the password field is present, visible and enabled in the current frame"""
+        fields = driver.find_elements(By.ID, "password")
+        if fields and fields[0].is_displayed() and fields[0].is_enabled():
+            return fields[0]
+        return False
 
-            time.sleep(3)
+    def login(self):
+        """Log in to SRM Academia portal, waiting on explicit readiness conditions instead of fixed sleeps"""
+        self.login_timings = {}
+        login_started = time.time()
+        try:
+            self.timed_login_step("load_login_page", lambda: self.driver.get(LOGIN_URL), attempts=1)
+            wait = WebDriverWait(self.driver, 30)
+
+            # Switch to the sign-in iframe as soon as it is attached
+            self.timed_login_step(
+                "switch_iframe",
+                lambda: wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "signinFrame")))
+            )
+            logger.info("Switched to login iframe")
+
+            def enter_email():
+                email_field = wait.until(EC.element_to_be_clickable((By.ID, "login_id")))
+                email_field.clear()
+                email_field.send_keys(self.email)
+            self.timed_login_step("enter_email", enter_email)
+            logger.info(f"Entered email: {self.email}")
+
+            def click_next():
+                next_btn = wait.until(EC.element_to_be_clickable((By.ID, "nextbtn")))
+                self.driver.execute_script("arguments[0].click();", next_btn)  # JavaScript click
+            self.timed_login_step("click_next", click_next)
+            logger.info("Clicked Next")
+
+            # The password step is rendered in place; if it never shows up in this frame,
+            # the iframe was reloaded and we need to re-enter it
+            def wait_for_password():
+                try:
+                    return WebDriverWait(self.driver, 10).until(self.password_field_ready)
+                except Exception:
+                    logger.info("Switching iframe context for password field")
+                    self.driver.switch_to.default_content()
+                    wait.until(EC.frame_to_be_available_and_switch_to_it((By.ID, "signinFrame")))
+                    return wait.until(self.password_field_ready)
+            self.timed_login_step("password_ready", wait_for_password, attempts=1)
 
-            # Switch back to default content
+            def enter_password():
+                field = wait.until(self.password_field_ready)
+                field.clear()
+                field.send_keys(self.password)
+            try:
+                self.timed_login_step("enter_password", enter_password)
+                logger.info("Entered password")
+            except Exception:
+                # Try one more approach - use JavaScript to set the value
+                logger.info("Trying JavaScript approach to enter password")
+                self.driver.execute_script(
+                    'document.getElementById("password").value = arguments[0]',
+                    self.password
+                )
+                logger.info("Entered password via JavaScript")
+
+            url_before_submit = self.driver.current_url
+
+            def click_sign_in():
+                sign_in_btn = wait.until(EC.element_to_be_clickable((By.ID, "nextbtn")))
+                self.driver.execute_script("arguments[0].click();", sign_in_btn)  # JavaScript click
+            self.timed_login_step("click_sign_in", click_sign_in)
+            logger.info("Clicked Sign In")
+
+            # Switch back to default content and wait for the dashboard to replace the login page
             self.driver.switch_to.default_content()
+            dashboard_anchor = (By.XPATH, "//a[contains(@href, 'My_Attendance')]")
+
+            def wait_for_dashboard():
+                try:
+                    wait.until(lambda d: d.find_elements(*dashboard_anchor) or d.current_url != url_before_submit)
+                except Exception as e:
+                    logger.warning(f"⚠️ Dashboard did not appear after sign in: {e}")
+            self.timed_login_step("post_submit", wait_for_dashboard, attempts=1)
 
             # Verify login success
             if BASE_URL in self.driver.current_url:
@@ -383,41 +638,7 @@ class SRMScraper:
                         cookies = self.driver.get_cookies()
                         cookie_dict = {cookie['name']: cookie['value'] for cookie in cookies}
                         logger.info(f"✅ Extracted {len(cookie_dict)} cookies: {list(cookie_dict.keys())}")
-
-                        # Generate JWT token
-                        token = self.create_jwt_token(self.email)
-                        if not token:
-                            raise Exception("Failed to generate JWT token")
-
-                        # Save cookies and token to file for debugging
-                        debug_data = {
-                            'cookies': cookie_dict,
-                            'token': token
-                        }
-                        with open('debug_cookies.json', 'w') as f:
-                            json.dump(debug_data, f)
-                        logger.info("✅ Saved cookies and token to debug file")
-
-                        # Store cookies and token in Supabase
-                        try:
-                            cookie_data = {
-                                'email': self.email,
-                                'cookies': cookie_dict,
-                                'token': token,
-                                'updated_at': datetime.now().isoformat()
-                            }
-
-                            # Delete old record first
-                            supabase.table('user_cookies').delete().eq('email', self.email).execute()
-                            logger.info("✅ Deleted old cookie record")
-
-                            # Insert new record
-                            result = supabase.table('user_cookies').insert(cookie_data).execute()
-                            logger.info("✅ Stored new cookie record with token")
-
-                        except Exception as e:
-                            logger.error(f"❌ Failed to store cookies and token in Supabase: {e}")
-
+                        self.store_session_cookies(cookie_dict)
                     except Exception as e:
                         logger.error(f"❌ Failed to extract/store cookies and token: {e}")
 
@@ -435,28 +656,147 @@ class SRMScraper:
         except Exception as e:
             logger.error(f"Error during login: {e}")
             return False
+        finally:
+            self.login_timings["total"] = round(time.time() - login_started, 3)
+            logger.info(f"Login step timings (s): {self.login_timings}")
 
     def get_attendance_page(self):
-        """Navigate to attendance page and get HTML"""
+        """Navigate to attendance page and get HTML (empty when the js backend reads the live page)"""
         if not self.ensure_login():
             return None
 
         logger.info("Navigating to attendance page")
         self.driver.get(ATTENDANCE_PAGE_URL)
 
-        try:
-            # Use a fixed sleep time of 10 seconds (reduced from 13)
-            logger.info("Using fixed sleep time of 10 seconds to ensure page loads")
-            time.sleep(10)
-            logger.info("Attendance page loaded successfully")
-        except Exception as e:
-            logger.warning(f"Timed out waiting for attendance page: {e}")
-            # Fallback to a longer sleep if the element isn't found
-            logger.info("Using fallback sleep time of 12 additional seconds")
-            time.sleep(12)
+        # Return as soon as the attendance table has finished rendering
+        ready, waited = wait_for_table_ready(self.driver, ATTENDANCE_TABLE_XPATH)
+        self.page_wait_times["attendance"] = round(waited, 2)
+        if ready:
+            logger.info(f"Attendance page loaded successfully in {waited:.2f}s")
+        else:
+            logger.warning("Attendance table not detected; using whatever has rendered")
+
+        return self.snapshot("attendance")
+
+    def load_pages_in_tabs(self, pages, timeout=PAGE_READY_TIMEOUT):
+        """
+        Open several pages in separate tabs of the logged-in driver so they render
+        at the same time, and harvest each tab's HTML as soon as its table is ready.
+        `pages` maps a name to (url, table_xpath). Returns name -> {html, handle, ready, waited}.
+        """
+        if not self.ensure_login():
+            return {}
 
-        html_source = self.driver.page_source
-        return html_source
+        started = time.time()
+        tabs = {}
+        for index, (name, (url, table_xpath)) in enumerate(pages.items()):
+            if index == 0:
+                self.driver.get(url)
+            else:
+                self.driver.switch_to.new_window('tab')
+                if NETWORK_PROFILE_ENABLED:
+                    # URL blocking is installed per tab
+                    network_profile.enable(self.driver)
+                self.driver.get(url)
+            logger.info(f"Opened {name} page in its own tab")
+            tabs[name] = {
+                "handle": self.driver.current_window_handle,
+                "probe": TableReadinessProbe(table_xpath),
+                "html": None,
+                "ready": False,
+                "waited": None
+            }
+
+        # Round-robin over the tabs that are still rendering
+        pending = list(tabs)
+        while pending:
+            for name in list(pending):
+                tab = tabs[name]
+                self.driver.switch_to.window(tab["handle"])
+                waited = time.time() - started
+                timed_out = waited >= timeout
+                if tab["probe"].check(self.driver) or timed_out:
+                    tab["ready"] = not timed_out
+                    tab["waited"] = round(waited, 2)
+                    tab["html"] = self.snapshot(name)
+                    self.page_wait_times[name] = tab["waited"]
+                    pending.remove(name)
+                    if tab["ready"]:
+                        logger.info(f"✅ {name} tab ready after {waited:.2f}s")
+                    else:
+                        logger.warning(f"⚠️ {name} tab not ready after {waited:.2f}s; using whatever has rendered")
+            if pending:
+                time.sleep(PAGE_READY_POLL_INTERVAL)
+
+        logger.info(f"Loaded {len(tabs)} tabs in {time.time() - started:.2f}s")
+        return {name: {k: v for k, v in tab.items() if k != "probe"} for name, tab in tabs.items()}
+
+    def needs_html(self):
+        """Whether parsers need a serialised snapshot, or the js backend will read the live page"""
+        return dom_extract.EXTRACTION_BACKEND != "js" or not self.driver
+
+    def snapshot(self, name):
+        """Capture the current page for the HTML parsers; empty when the js backend reads the live page"""
+        return self.capture.capture(self.driver, name) if self.needs_html() else ""
+
+    def soup_fields(self):
+        """BeautifulSoup counterparts of the dom_extract scripts, one per document field"""
+        return {
+            "registration_number": self.extract_registration_number,
+            "attendance_rows": self.extract_attendance_rows,
+            "marks_rows": self.extract_marks_rows,
+            "course_table": self.extract_course_table,
+            "batch": self.extract_batch_number
+        }
+
+    def parsed_document(self, html):
+        """
+        The parsed form of `html`. The attendance, marks and details extractors of one
+        scrape all read the same page, so it is parsed once and each field found once.
+        """
+        if self.document is None or not self.document.matches(html):
+            if PARSER_BACKEND == "selectolax":
+                self.document = ParsedDocument(html, parse_tree, SELECTOLAX_FIELDS)
+            else:
+                self.document = ParsedDocument(html, make_soup, self.soup_fields())
+        return self.document
+
+    def page_registration_number(self, html_source):
+        """Registration number of a loaded page, found in the same parse the attendance and marks extractors reuse"""
+        if html_source:
+            return self.parsed_document(html_source).get("registration_number")
+        return self.extract_page_data("details", html_source, self.driver)["registration_number"]
+
+    def parse_extract(self, kind, html):
+        """Extract `kind` from page HTML with the configured HTML_PARSER_BACKEND"""
+        return self.parsed_document(html).extract(kind)
+
+    def extract_page_data(self, kind, html=None, driver=None):
+        """
+        Extract compact data for `kind` ('attendance', 'marks', 'timetable' or 'details').
+        With a live driver the EXTRACTION_BACKEND decides: 'js' runs the in-page script,
+        'compare' runs both and keeps the BeautifulSoup result. Otherwise `html`
+        (or a snapshot of the current page) is parsed with the HTML_PARSER_BACKEND.
+        """
+        backend = dom_extract.EXTRACTION_BACKEND if driver else "soup"
+        js_result = None
+        if backend in ("js", "compare"):
+            try:
+                js_result = dom_extract.run_extraction(driver, kind)
+                if backend == "js":
+                    return js_result
+            except Exception as e:
+                logger.warning(f"⚠️ In-page {kind} extraction failed, parsing HTML instead: {e}")
+                backend = "soup"
+
+        if not html:
+            html = self.capture.current(driver)
+        started = time.time()
+        soup_result = self.parse_extract(kind, html)
+        dom_extract.record_run(kind, "soup", time.time() - started)
+        if backend == "compare":
+            dom_extract.record_comparison(kind, soup_result, js_result)
+        return soup_result
 
     def extract_registration_number(self, soup):
         """Extract registration number from page HTML"""
@@ -484,6 +824,12 @@ class SRMScraper:
         return registration_number
 
     def get_user_id(self, registration_number):
+        """Get or create user ID in Supabase, once per scrape"""
+        if not self.user_ids.get(registration_number):
+            self.user_ids[registration_number] = self.lookup_user_id(registration_number)
+        return self.user_ids[registration_number]
+
+    def lookup_user_id(self, registration_number):
         """Get or create user ID in Supabase"""
         try:
             resp = supabase.table("users").select("id, registration_number").eq("email", self.email).single().execute()
@@ -509,12 +855,72 @@ class SRMScraper:
             logger.error(f"Error inserting user: {insert_resp.error}")
             return None
 
+    def extract_attendance_rows(self, soup):
+        """Cell texts of every attendance row, or None when the page has no attendance table"""
+        attendance_tables = [table for table in soup.find_all("table") if "Course Code" in table.text]
+        if not attendance_tables:
+            return None
+        rows = []
+        for attendance_table in attendance_tables:
+            for row in attendance_table.find_all("tr")[1:]:  # skip header row
+                cols = row.find_all("td")
+                if len(cols) >= 8:
+                    rows.append([col.text.strip() for col in cols[:8]])
+        return rows
+
+    def build_attendance_records(self, rows, registration_number):
+        """Turn extracted attendance cells into deduplicated attendance records"""
+        attendance_records = []
+        for cols in rows:
+            try:
+                record = {
+                    "course_code": cols[0],
+                    "course_title": cols[1],
+                    "category": cols[2],
+                    "faculty": cols[3],
+                    "slot": cols[4],
+                    "hours_conducted": int(cols[5]) if cols[5].isdigit() else 0,
+                    "hours_absent": int(cols[6]) if cols[6].isdigit() else 0,
+                    "attendance_percentage": float(cols[7]) if cols[7].replace('.', '', 1).isdigit() else 0.0
+                }
+                attendance_records.append(record)
+            except Exception as ex:
+                logger.warning(f"Error parsing row: {ex}")
+
+        # Optional: Deduplicate records if needed
+        unique_records = {}
+        for rec in attendance_records:
+            key = (registration_number, rec["course_code"], rec["category"])
+            if key not in unique_records:
+                unique_records[key] = rec
+        attendance_records = list(unique_records.values())
+        logger.info(f"Parsed {len(attendance_records)} unique attendance records.")
+        return attendance_records
+
+    def skip_unchanged_write(self, table, row, payload_hash):
+        """
+        True when the stored row already holds this exact content: only its checked_at
+        is touched and the JSON rewrite is skipped. Records changed/unchanged in self.changes.
+        """
+        if not row or row.get("content_hash") != payload_hash:
+            self.changes[table] = "changed"
+            return False
+        self.changes[table] = "unchanged"
+        try:
+            supabase.table(table).update({
+                "checked_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            }).eq("user_id", row["user_id"]).execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to touch {table}.checked_at: {e}")
+        logger.info(f"✅ {table.capitalize()} unchanged since the last scrape; skipped the rewrite.")
+        return True
+
     def parse_and_save_attendance(self, html, driver):
         """Parse attendance data and save to Supabase"""
         try:
             logger.info("Parsing and saving attendance data...")
-            soup = BeautifulSoup(html, "html.parser")
-            registration_number = self.extract_registration_number(soup)
+            data = self.extract_page_data("attendance", html, driver)
+            registration_number = data["registration_number"]
             if not registration_number:
                 logger.error("Could not find Registration Number!")
                 return False
@@ -526,42 +932,10 @@ class SRMScraper:
                 logger.error("Could not retrieve or create user in Supabase.")
                 return False
 
-            # Extract all attendance tables from the page
-            attendance_tables = [table for table in soup.find_all("table") if "Course Code" in table.text]
-            if not attendance_tables:
+            if data["rows"] is None:
                 logger.error("No attendance table found!")
                 return False
-
-            # Collect attendance records from all tables
-            attendance_records = []
-            for attendance_table in attendance_tables:
-                rows = attendance_table.find_all("tr")[1:]  # skip header row
-                for row in rows:
-                    cols = row.find_all("td")
-                    if len(cols) >= 8:
-                        try:
-                            record = {
-                                "course_code": cols[0].text.strip(),
-                                "course_title": cols[1].text.strip(),
-                                "category": cols[2].text.strip(),
-                                "faculty": cols[3].text.strip(),
-                                "slot": cols[4].text.strip(),
-                                "hours_conducted": int(cols[5].text.strip()) if cols[5].text.strip().isdigit() else 0,
-                                "hours_absent": int(cols[6].text.strip()) if cols[6].text.strip().isdigit() else 0,
-                                "attendance_percentage": float(cols[7].text.strip()) if cols[7].text.strip().replace('.', '', 1).isdigit() else 0.0
-                            }
-                            attendance_records.append(record)
-                        except Exception as ex:
-                            logger.warning(f"Error parsing row: {ex}")
-
-            # Optional: Deduplicate records if needed
-            unique_records = {}
-            for rec in attendance_records:
-                key = (registration_number, rec["course_code"], rec["category"])
-                if key not in unique_records:
-                    unique_records[key] = rec
-            attendance_records = list(unique_records.values())
-            logger.info(f"Parsed {len(attendance_records)} unique attendance records.")
+            attendance_records = self.build_attendance_records(data["rows"], registration_number)
 
             # Build the JSON object for all attendance data
             attendance_json = {
@@ -570,26 +944,44 @@ class SRMScraper:
                 "records": attendance_records
             }
 
+            attendance_hash = content_hash(attendance_json)
+            self.registration_fingerprint = registration_fingerprint(attendance_records)
+            now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
             # Upsert the JSON object in Supabase
             try:
-                sel_resp = supabase.table("attendance").select("id").eq("user_id", user_id).execute()
+                sel_resp = supabase.table("attendance").select(
+                    "id, user_id, content_hash, registration_fingerprint"
+                ).eq("user_id", user_id).execute()
             except Exception as e:
                 logger.error(f"Database operation timed out or failed: {e}")
                 sel_resp = None
 
             if sel_resp and sel_resp.data and len(sel_resp.data) > 0:
+                stored = sel_resp.data[0]
+                if stored.get("registration_fingerprint") != self.registration_fingerprint:
+                    stored = None  # Rows saved before fingerprints existed are rewritten once to record one
+                if self.skip_unchanged_write("attendance", stored, attendance_hash):
+                    return True
                 up_resp = supabase.table("attendance").update({
                     "attendance_data": attendance_json,
-                    "updated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+                    "content_hash": attendance_hash,
+                    "registration_fingerprint": self.registration_fingerprint,
+                    "checked_at": now,
+                    "updated_at": now
                 }).eq("user_id", user_id).execute()
                 if up_resp.data:
                     logger.info("✅ Attendance JSON updated successfully.")
                 else:
                     logger.error("❌ Failed to update attendance JSON.")
             else:
+                self.changes["attendance"] = "changed"
                 in_resp = supabase.table("attendance").insert({
                     "user_id": user_id,
-                    "attendance_data": attendance_json
+                    "attendance_data": attendance_json,
+                    "content_hash": attendance_hash,
+                    "registration_fingerprint": self.registration_fingerprint,
+                    "checked_at": now
                 }).execute()
                 if in_resp.data:
                     logger.info("✅ Attendance JSON inserted successfully.")
@@ -624,15 +1016,97 @@ class SRMScraper:
         logger.warning(f"No match found for {course_code}, using fallback course code.")
         return course_code
 
+    def extract_marks_rows(self, soup):
+        """
+        [course_code, title, [[test_info, obtained_text], ...]] for every marks row,
+        or None when the page has no "Test Performance" table
+        """
+        # Locate the marks table by searching for "Test Performance"
+        marks_table = None
+        for table in soup.find_all("table"):
+            header = table.find("tr")
+            if header and "Test Performance" in header.get_text():
+                marks_table = table
+                break
+        if not marks_table:
+            return None
+
+        rows = []
+        for row in marks_table.find_all("tr")[1:]:  # Skip header row
+            try:
+                cells = row.find_all("td")
+                if len(cells) < 3:
+                    continue
+
+                # The third cell contains a nested table with test details
+                nested_table = cells[2].find("table")
+                tests = []
+                if nested_table:
+                    for tc in nested_table.find_all("td"):
+                        strong_elem = tc.find("strong")
+                        if not strong_elem:
+                            continue
+                        br = tc.find("br")
+                        obtained_text = br.next_sibling.strip() if br and br.next_sibling else "0"
+                        tests.append([strong_elem.get_text(strip=True), obtained_text])
+                rows.append([cells[0].get_text(strip=True), cells[1].get_text(strip=True), tests])
+            except Exception as row_err:
+                logger.warning(f"Error processing a row: {row_err}")
+                continue
+        return rows
+
+    def build_marks_records(self, rows, attendance_records):
+        """Turn extracted marks cells into marks records, naming courses from the attendance records"""
+        marks_records = []
+        for course_code, fallback_title, test_cells in rows:
+            try:
+                # Try to map course title using attendance records
+                if attendance_records:
+                    try:
+                        course_title = self.get_course_title(course_code, attendance_records)
+                    except Exception as e:
+                        logger.error(f"Error mapping course code {course_code}: {e}")
+                        course_title = fallback_title
+                else:
+                    course_title = fallback_title
+
+                tests = []
+                for test_info, obtained_text in test_cells:
+                    parts = test_info.split("/")
+                    test_code = parts[0].strip()
+                    try:
+                        max_marks = float(parts[1].strip()) if len(parts) == 2 else 0.0
+                    except:
+                        max_marks = 0.0
+                    try:
+                        obtained_marks = float(obtained_text) if obtained_text.replace(".", "").isdigit() else obtained_text
+                    except:
+                        obtained_marks = obtained_text
+                    tests.append({
+                        "test_code": test_code,
+                        "max_marks": max_marks,
+                        "obtained_marks": obtained_marks
+                    })
+
+                marks_records.append({
+                    "course_name": course_title,
+                    "tests": tests
+                })
+                logger.info(f"Mapping: {course_code} → {course_title}")
+            except Exception as row_err:
+                logger.warning(f"Error processing a row: {row_err}")
+                continue
+        return marks_records
+
     def parse_and_save_marks(self, html, driver):
         """
         Scrapes the marks details from the page and upserts the data into the Supabase 'marks' table.
         This function handles any number of courses dynamically and includes multiple defense mechanisms.
         """
-        soup = BeautifulSoup(html, "html.parser")
+        data = self.extract_page_data("marks", html, driver)
 
         # Extract registration number
-        registration_number = self.extract_registration_number(soup)
+        registration_number = data["registration_number"]
         if not registration_number:
             logger.error("Could not find Registration Number for marks!")
             return False
@@ -656,75 +1130,10 @@ class SRMScraper:
             attendance_records = attendance_data.get("records", [])
         logger.info(f"Loaded {len(attendance_records)} attendance records for user {user_id}")
 
-        # Locate the marks table by searching for "Test Performance"
-        marks_table = None
-        for table in soup.find_all("table"):
-            header = table.find("tr")
-            if header and "Test Performance" in header.get_text():
-                marks_table = table
-                break
-        if not marks_table:
+        if data["rows"] is None:
             logger.error("No marks table found!")
             return False
-
-        marks_records = []
-        rows = marks_table.find_all("tr")
-        if rows:
-            for row in rows[1:]:  # Skip header row
-                try:
-                    cells = row.find_all("td")
-                    if len(cells) < 3:
-                        continue
-
-                    course_code = cells[0].get_text(strip=True)
-                    fallback_title = cells[1].get_text(strip=True)
-
-                    # Try to map course title using attendance records
-                    if attendance_records:
-                        try:
-                            course_title = self.get_course_title(course_code, attendance_records)
-                        except Exception as e:
-                            logger.error(f"Error mapping course code {course_code}: {e}")
-                            course_title = fallback_title
-                    else:
-                        course_title = fallback_title
-
-                    # The third cell contains a nested table with test details
-                    nested_table = cells[2].find("table")
-                    tests = []
-                    if nested_table:
-                        test_cells = nested_table.find_all("td")
-                        for tc in test_cells:
-                            strong_elem = tc.find("strong")
-                            if not strong_elem:
-                                continue
-                            test_info = strong_elem.get_text(strip=True)
-                            parts = test_info.split("/")
-                            test_code = parts[0].strip()
-                            try:
-                                max_marks = float(parts[1].strip()) if len(parts) == 2 else 0.0
-                            except:
-                                max_marks = 0.0
-                            br = tc.find("br")
-                            obtained_text = br.next_sibling.strip() if br and br.next_sibling else "0"
-                            try:
-                                obtained_marks = float(obtained_text) if obtained_text.replace(".", "").isdigit() else obtained_text
-                            except:
-                                obtained_marks = obtained_text
-                            tests.append({
-                                "test_code": test_code,
-                                "max_marks": max_marks,
-                                "obtained_marks": obtained_marks
-                            })
-
-                    marks_records.append({
-                        "course_name": course_title,
-                        "tests": tests
-                    })
-                    logger.info(f"Mapping: {course_code} → {course_title}")
-                except Exception as row_err:
-                    logger.warning(f"Error processing a row: {row_err}")
-                    continue
+        marks_records = self.build_marks_records(data["rows"], attendance_records)
 
         logger.info(f"Parsed {len(marks_records)} unique marks records.")
 
@@ -735,18 +1144,25 @@ class SRMScraper:
             "records": marks_records
         }
 
+        marks_hash = content_hash(marks_json)
+        now = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+
         # Save data in Supabase using update/insert pattern with defense mechanisms
         try:
-            sel_resp = supabase.table("marks").select("id").eq("user_id", user_id).execute()
+            sel_resp = supabase.table("marks").select("id, user_id, content_hash").eq("user_id", user_id).execute()
         except Exception as e:
             logger.error(f"Error selecting marks record: {e}")
             sel_resp = None
 
         if sel_resp and sel_resp.data and len(sel_resp.data) > 0:
+            if self.skip_unchanged_write("marks", sel_resp.data[0], marks_hash):
+                return True
             try:
                 up_resp = supabase.table("marks").update({
                     "marks_data": marks_json,
-                    "updated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+                    "content_hash": marks_hash,
+                    "checked_at": now,
+                    "updated_at": now
                 }).eq("user_id", user_id).execute()
                 if up_resp.data and len(up_resp.data) > 0:
                     logger.info("Marks JSON updated successfully.")
@@ -757,7 +1173,9 @@ class SRMScraper:
                 try:
                     in_resp = supabase.table("marks").insert({
                         "user_id": user_id,
-                        "marks_data": marks_json
+                        "marks_data": marks_json,
+                        "content_hash": marks_hash,
+                        "checked_at": now
                     }).execute()
                     if in_resp.data and len(in_resp.data) > 0:
                         logger.info("Marks JSON inserted successfully as fallback.")
@@ -767,10 +1185,13 @@ class SRMScraper:
                     logger.error(f"Final failure in saving marks JSON: {insert_err}")
                     return False
         else:
+            self.changes["marks"] = "changed"
             try:
                 in_resp = supabase.table("marks").insert({
                     "user_id": user_id,
-                    "marks_data": marks_json
+                    "marks_data": marks_json,
+                    "content_hash": marks_hash,
+                    "checked_at": now
                 }).execute()
                 if in_resp.data and len(in_resp.data) > 0:
                     logger.info("Marks JSON inserted successfully.")
@@ -785,32 +1206,46 @@ class SRMScraper:
     # TIMETABLE SCRAPER METHODS
 
     def get_timetable_page(self):
-        """Navigate to timetable page and get HTML"""
+        """Navigate to timetable page and get HTML (empty when the js backend reads the live page)"""
         if not self.ensure_login():
             return None
 
         logger.info(f"Navigating to timetable page: {TIMETABLE_URL}")
         self.driver.get(TIMETABLE_URL)
-        time.sleep(18)  # Wait for the page to load (reduced from 22)
 
-        html_source = self.driver.page_source
-        return html_source
+        # Return as soon as the course table has finished rendering
+        ready, waited = wait_for_table_ready(self.driver, TIMETABLE_TABLE_XPATH)
+        self.page_wait_times["timetable"] = round(waited, 2)
+        if not ready:
+            logger.warning("Timetable table not detected; using whatever has rendered")
+
+        return self.snapshot("timetable")
 
     def dump_page_source(self, filename="debug_page_source.html", num_chars=1000):
         """
         Writes the first 'num_chars' characters of the page source to a file.
         If you need the full source, set num_chars to None.
         """
-        source = self.driver.page_source if num_chars is None else self.driver.page_source[:num_chars]
+        source = self.capture.current(self.driver)
+        if num_chars is not None:
+            source = source[:num_chars]
         with open(filename, "w", encoding="utf-8") as f:
             f.write(source)
         logger.info(f"Page source snippet dumped to {filename}")
 
-    def parse_batch_number_from_page(self):
+    def parse_batch_number_from_page(self, html_source=None):
         """
         Extract batch number from either timetable or attendance page HTML.
+        Reads the current page (via the extraction backend) unless `html_source` is given.
         Returns the batch number as a string or None if not found.
         """
+        if html_source is not None:
+            return self.parse_extract("details", html_source)["batch"]
+
+        batch = self.extract_page_data("details", driver=self.driver)["batch"]
+        if batch:
+            return batch
+        # The batch details may not have rendered yet
         try:
             WebDriverWait(self.driver, 50).until(
                 EC.presence_of_element_located((By.XPATH, "//*[contains(text(),'Batch')]"))
@@ -818,9 +1253,10 @@ class SRMScraper:
         except Exception as e:
             logger.warning(f"Timeout waiting for batch element: {e}")
             # We'll try to parse from the current page source anyway
+        return self.extract_page_data("details", self.snapshot("batch"), self.driver)["batch"]
 
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-
+    def extract_batch_number(self, soup):
+        """Find the batch number in a parsed page, or None"""
         # Method 1: Look for a table cell with "Batch:" label
         batch_label = soup.find("td", string=lambda text: text and "Batch:" in text)
         if batch_label:
@@ -863,75 +1299,92 @@ class SRMScraper:
 
         return None
 
-    def scrape_timetable(self):
+    def extract_course_table(self, soup):
+        """Header and cell texts of the course table, or None when the page has none"""
+        table = soup.find("table", class_="course_tbl")
+        if not table:
+            # Some pages have a different class or structure
+            for t in soup.find_all("table"):
+                if "Course Code" in t.get_text():
+                    table = t
+                    break
+        if not table:
+            return None
+        rows = table.find_all("tr")
+        if not rows:
+            return {"headers": [], "rows": []}
+        return {
+            "headers": [cell.get_text(strip=True) for cell in rows[0].find_all(["th", "td"])],
+            "rows": [[cell.get_text(strip=True) for cell in row.find_all("td")] for row in rows[1:]]
+        }
+
+    def build_course_rows(self, course_table):
+        """Map course table cells to course entries by header name"""
+        headers = course_table["headers"]
+
+        def col_index(name):
+            for i, h in enumerate(headers):
+                if name in h:
+                    return i
+            return -1
+
+        idx_code = col_index("Course Code")
+        idx_title = col_index("Course Title")
+        idx_slot = col_index("Slot")
+        idx_gcr = col_index("GCR Code")
+        idx_faculty = col_index("Faculty")
+        idx_ctype = col_index("Course Type")
+        idx_room = col_index("Room")
+
+        data_rows = []
+        for cells in course_table["rows"]:
+            if len(cells) > max(idx_code, idx_title, idx_slot, idx_faculty, idx_ctype, idx_room):
+                course_code = cells[idx_code]
+                course_title = cells[idx_title]
+                slot = cells[idx_slot]
+                gcr_code = cells[idx_gcr] if idx_gcr != -1 else ""
+                faculty_name = cells[idx_faculty] if idx_faculty != -1 else ""
+                course_type = cells[idx_ctype] if idx_ctype != -1 else ""
+                room_no = cells[idx_room] if idx_room != -1 else ""
+
+                if course_code and course_title:
+                    data_rows.append({
+                        "course_code": course_code,
+                        "course_title": course_title,
+                        "slot": slot,
+                        "gcr_code": gcr_code,
+                        "faculty_name": faculty_name,
+                        "course_type": course_type,
+                        "room_no": room_no
+                    })
+        return data_rows
+
+    def scrape_timetable(self, html_source=None):
         """
         Scrapes the timetable table from the page.
+        Pass `html_source` when the timetable page has already been loaded (e.g. in a parallel tab).
         """
-        html_source = self.get_timetable_page()
-        if not html_source:
+        if html_source is None:
+            html_source = self.get_timetable_page()
+        if html_source is None:
             return []
 
         max_retries = 3
         extracted_rows = []
 
         for attempt in range(max_retries):
+            if attempt > 0 and not self.driver:
+                # Pre-fetched HTML (e.g. from the HTTP engine) has no live page to re-read
+                break
             logger.info(f"Attempt {attempt+1}: Extracting timetable table...")
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-
-            # Attempt to find the timetable
-            table = soup.find("table", class_="course_tbl")
-            if not table:
-                # Some pages have a different class or structure
-                for t in soup.find_all("table"):
-                    if "Course Code" in t.get_text():
-                        table = t
-                        break
+            if attempt > 0:
+                # The page re-rendered while we waited; take one new snapshot of it
+                html_source = self.snapshot("timetable")
 
-            if table:
+            course_table = self.extract_page_data("timetable", html_source, self.driver)
+            if course_table and len(course_table["rows"]) >= 1:
                 try:
-                    rows = table.find_all("tr")
-                    if len(rows) < 2:
-                        continue
-                    header_cells = rows[0].find_all(["th", "td"])
-                    headers = [cell.get_text(strip=True) for cell in header_cells]
-
-                    def col_index(name):
-                        for i, h in enumerate(headers):
-                            if name in h:
-                                return i
-                        return -1
-
-                    idx_code = col_index("Course Code")
-                    idx_title = col_index("Course Title")
-                    idx_slot = col_index("Slot")
-                    idx_gcr = col_index("GCR Code")
-                    idx_faculty = col_index("Faculty")
-                    idx_ctype = col_index("Course Type")
-                    idx_room = col_index("Room")
-
-                    data_rows = []
-                    for row in rows[1:]:
-                        cells = row.find_all("td")
-                        if len(cells) > max(idx_code, idx_title, idx_slot, idx_faculty, idx_ctype, idx_room):
-                            course_code = cells[idx_code].get_text(strip=True)
-                            course_title = cells[idx_title].get_text(strip=True)
-                            slot = cells[idx_slot].get_text(strip=True)
-                            gcr_code = cells[idx_gcr].get_text(strip=True) if idx_gcr != -1 else ""
-                            faculty_name = cells[idx_faculty].get_text(strip=True) if idx_faculty != -1 else ""
-                            course_type = cells[idx_ctype].get_text(strip=True) if idx_ctype != -1 else ""
-                            room_no = cells[idx_room].get_text(strip=True) if idx_room != -1 else ""
-
-                            if course_code and course_title:
-                                data_rows.append({
-                                    "course_code": course_code,
-                                    "course_title": course_title,
-                                    "slot": slot,
-                                    "gcr_code": gcr_code,
-                                    "faculty_name": faculty_name,
-                                    "course_type": course_type,
-                                    "room_no": room_no
-                                })
-
+                    data_rows = self.build_course_rows(course_table)
                     if data_rows:
                         logger.info(f"Extracted {len(data_rows)} course entries.")
                         extracted_rows = data_rows
@@ -939,7 +1392,9 @@ class SRMScraper:
                 except Exception as e:
                     logger.warning(f"Error parsing table on attempt {attempt+1}: {e}")
 
-            time.sleep(5)
+            # Give a slow page a little longer before re-reading it
+            if self.driver:
+                wait_for_table_ready(self.driver, TIMETABLE_TABLE_XPATH, timeout=5)
 
         if not extracted_rows:
             logger.error("Failed to extract timetable table after retries.")
@@ -1141,12 +1596,20 @@ class SRMScraper:
             # Check if timetable exists
             existing = supabase.table("timetable").select("*").eq("user_id", user_id).execute()
 
+            # The registration this timetable was built for; later attendance scrapes compare against it
+            fingerprint = self.registration_fingerprint
+            if not fingerprint:
+                attendance = supabase.table("attendance").select("registration_fingerprint").eq("user_id", user_id).execute()
+                fingerprint = attendance.data[0].get("registration_fingerprint") if attendance.data else None
+
             # Prepare timetable data
             timetable_data = {
                 "user_id": user_id,
                 "timetable_data": merged_result["merged_timetable"],
                 "batch": merged_result["batch"],
-                "personal_details": merged_result.get("personal_details", {})
+                "personal_details": merged_result.get("personal_details", {}),
+                "registration_fingerprint": fingerprint,
+                "updated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
             }
 
             # Add delay before final operation
@@ -1170,15 +1633,95 @@ class SRMScraper:
             logger.error(f"❌ Error storing timetable data: {e}")
             return False
 
-    def run_timetable_scraper(self):
-        """Public interface to run the timetable scraper"""
+    def fetch_page_over_http(self, page_name):
+        """
+        Fetch an Academia page with the stored session, logging in over HTTP when
+        there is none or it has expired. Returns None when the browser is needed instead.
+        """
+        stored = self.load_stored_session()
+        cookies = stored['cookies'] if stored else None
+        fresh = False
+        while True:
+            if not cookies:
+                if fresh:
+                    return None
+                cookies, fresh = self.authenticate_http(), True
+                if not cookies:
+                    return None
+            try:
+                return HttpScraper(cookies).fetch_page(page_name)
+            except SessionExpired as e:
+                logger.info(f"HTTP engine session expired: {e}")
+                cookies = None
+            except Exception as e:
+                logger.warning(f"⚠️ HTTP engine failed to fetch {page_name}: {e}")
+                return None
+
+    def run_http_timetable_scraper(self):
+        """Scrape the timetable over plain HTTP; returns None when the browser is needed instead"""
+        html_source = self.fetch_page_over_http(TIMETABLE_PAGE_NAME)
+        if not html_source:
+            return None
+
+        course_data = self.scrape_timetable(html_source=html_source)
+        if not course_data:
+            return None
+        auto_batch = self.parse_batch_number_from_page(html_source=html_source)
+        merged_result = self.merge_timetable_with_courses(course_data, auto_batch)
+        if merged_result["status"] != "success":
+            return None
+        if not self.store_timetable_in_supabase(merged_result):
+            logger.error("Failed to store timetable in Supabase.")
+        merged_result["engine"] = "http"
+        logger.info("Timetable scraped over HTTP without a browser")
+        return merged_result
+
+    def run_http_attendance_scraper(self):
+        """Scrape attendance and marks over plain HTTP; returns None when the browser is needed instead"""
+        html_source = self.fetch_page_over_http(ATTENDANCE_PAGE_NAME)
+        if not html_source:
+            return None
+        return self.save_attendance_page(html_source)
+
+    def save_attendance_page(self, html_source):
+        """Parse and store a browserless attendance payload; returns None when the browser is needed instead"""
+        registration_number = self.page_registration_number(html_source)
+        if not registration_number:
+            logger.warning("HTTP payload had no registration number; falling back to browser")
+            return None
+        if not self.get_user_id(registration_number):
+            return None
+
+        result = self.parse_and_save_attendance(html_source, None)
+        marks_result = self.parse_and_save_marks(html_source, None)
+        if not (result or marks_result):
+            logger.warning("HTTP payload had neither an attendance nor a marks table saved; falling back to browser")
+            return None
+        logger.info("Attendance scraped over HTTP without a browser")
+        return {
+            "status": "success",
+            "attendance": result,
+            "marks": marks_result,
+            "changes": dict(self.changes),
+            "engine": "http"
+        }
+
+    def run_timetable_scraper(self, http_first=True):
+        """Public interface to run the timetable scraper; http_first=False goes straight to the browser"""
         logger.info("Starting timetable scraper")
+        if HTTP_SCRAPER_ENABLED and http_first:
+            http_result = self.run_http_timetable_scraper()
+            if http_result:
+                return http_result
+            if self.credentials_rejected:
+                return self.credentials_error()
+            logger.info("Falling back to browser timetable scraping")
         try:
-            self.setup_driver()
+            self.lease_driver()
             success = self.ensure_login()
             if not success:
                 logger.error("Failed to log in to Academia. Aborting timetable scraping.")
-                return {"status": "error", "message": "Login failed"}
+                return self.credentials_error() if self.credentials_rejected else {"status": "error", "message": "Login failed"}
 
             # Step 1: Scrape timetable data
             course_data = self.scrape_timetable()
@@ -1193,7 +1736,7 @@ class SRMScraper:
             # Step 3: Merge timetable with course data
             merged_result = self.merge_timetable_with_courses(course_data, auto_batch)
             if merged_result["status"] != "success":
-                self.driver.quit()
+                self.release_driver()
                 return merged_result
 
             # Step 4: Store timetable data in Supabase
@@ -1203,22 +1746,32 @@ class SRMScraper:
             else:
                 logger.info("Timetable stored in Supabase successfully.")
 
-            self.driver.quit()
+            self.release_driver()
             logger.info("Timetable scraper finished successfully")
 
             return merged_result
 
         except Exception as e:
             logger.error(f"Error in timetable scraper: {str(e)}")
-            if self.driver:
-                self.driver.quit()
-            return {"status": "error", "message": str(e)}
-
-    def run_attendance_scraper(self):
-        """Public interface to run the attendance scraper"""
+            message = self.failure_message(e)
+            self.release_driver(discard=True)
+            return {"status": "error", "message": message}
+        finally:
+            # Early returns (e.g. login failure) still hand the driver back
+            self.release_driver()
+
+    def run_attendance_scraper(self, http_first=True):
+        """Public interface to run the attendance scraper; http_first=False goes straight to the browser"""
         logger.info("Starting attendance scraper")
+        if HTTP_SCRAPER_ENABLED and http_first:
+            http_result = self.run_http_attendance_scraper()
+            if http_result:
+                return http_result
+            if self.credentials_rejected:
+                return self.credentials_error()
+            logger.info("Falling back to browser attendance scraping")
         try:
-            self.driver = self.setup_driver()
+            self.lease_driver()
             if self.driver is None:
                 logger.error("Failed to initialize Chrome driver")
                 return {"status": "error", "message": "Failed to initialize Chrome driver"}
@@ -1228,14 +1781,14 @@ class SRMScraper:
             success = self.ensure_login()
             if not success:
                 logger.error("Failed to log in to Academia. Aborting attendance scraping.")
-                return {"status": "error", "message": "Login failed"}
+                return self.credentials_error() if self.credentials_rejected else {"status": "error", "message": "Login failed"}
 
             html_source = self.get_attendance_page()
-            if not html_source:
+            if html_source is None:
                 logger.error("Failed to load attendance page")
                 return {"status": "error", "message": "Failed to load attendance page"}
 
-            registration_number = self.extract_registration_number(BeautifulSoup(html_source, "html.parser"))
+            registration_number = self.page_registration_number(html_source)
             if not registration_number:
                 logger.error("Failed to extract registration number")
                 return {"status": "error", "message": "Failed to extract registration number"}
@@ -1248,26 +1801,31 @@ class SRMScraper:
             result = self.parse_and_save_attendance(html_source, self.driver)
             marks_result = self.parse_and_save_marks(html_source, self.driver)
 
-            self.driver.quit()
+            self.release_driver()
             logger.info("Attendance scraper finished successfully")
 
             combined_result = {
                 "status": "success",
                 "attendance": result,
-                "marks": marks_result
+                "marks": marks_result,
+                "changes": dict(self.changes)
             }
+            if self.network_stats:
+                combined_result["network"] = self.network_stats.as_dict()
             return combined_result
 
         except Exception as e:
             logger.error(f"Error in attendance scraper: {str(e)}")
-            if self.driver:
-                self.driver.quit()
-            return {"status": "error", "message": str(e)}
+            message = self.failure_message(e)
+            self.release_driver(discard=True)
+            return {"status": "error", "message": message}
+        finally:
+            self.release_driver()
 
     def clear_browser_cache(self):
         """Clear browser cache to free up memory"""
         try:
-            self.driver.execute_script("window.gc();")  # Force garbage collection
+            self.driver.execute_cdp_cmd('HeapProfiler.collectGarbage', {})  # Force JS garbage collection
             self.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
             logger.info("Browser cache cleared")
         except Exception as e:
@@ -1275,12 +1833,13 @@ class SRMScraper:
 
     def log_memory_usage(self):
         """Log current memory usage to help with debugging"""
-        try:
-            import psutil
-            process = psutil.Process(os.getpid())
-            logger.info(f"Memory usage: {process.memory_info().rss / 1024 / 1024:.2f} MB")
-        except:
+        python_rss = python_rss_mb()
+        if python_rss is None:
             logger.warning("Unable to log memory usage (psutil not available)")
+            return
+        chrome_rss = driver_process_tree_rss_mb(self.driver) if self.driver else None
+        chrome_text = f"{chrome_rss:.2f} MB" if chrome_rss is not None else "n/a"
+        logger.info(f"Memory usage: Python {python_rss:.2f} MB, Chrome tree {chrome_text}")
 
     def apply_timeouts(self):
         """Apply various timeouts to improve reliability on Render"""
@@ -1331,44 +1890,116 @@ class SRMScraper:
             return None
 
     def run_unified_scraper(self):
-        """Run both scrapers in a single session"""
+        """
+        Run both scrapers in a single browser session: one login, then the
+        attendance/marks page and the timetable page in the same driver.
+        """
         logger.info("Starting unified scraper")
 
         result = {
             "status": "error",
             "attendance_success": False,
+            "marks_success": False,
             "timetable_success": False,
             "timetable_data": None,
             "message": "Not started",
-            "cookies": None
+            "cookies": None,
+            "phases": {}
         }
 
-        try:
-            # Setup driver
-            self.driver = self.setup_driver()
-            if self.driver is None:
-                logger.error("Failed to initialize Chrome driver")
-                result["message"] = "Failed to initialize Chrome driver"
-                return result
+        def phase(name, status, started, message=None):
+            result["phases"][name] = {
+                "status": status,
+                "seconds": round(time.time() - started, 2)
+            }
+            if message:
+                result["phases"][name]["message"] = message
+            logger.info(f"Unified scraper phase '{name}': {status}")
 
-            # Login and extract cookies
+        try:
+            # Setup driver and log in once
+            started = time.time()
+            self.lease_driver()
             if not self.ensure_login():
                 logger.error("Failed to log in to Academia. Aborting all scraping.")
+                phase("login", "failed", started)
                 result["message"] = "Login failed"
+                if self.credentials_rejected:
+                    result.update(self.credentials_error())
                 return result
+            phase("login", "success", started)
 
             # Verify cookies after login
-            cookie_status = self.verify_cookies()
-            result["cookies"] = cookie_status
+            result["cookies"] = self.verify_cookies()
+
+            # Load both pages, in parallel tabs when enabled
+            timetable_html = None
+            if PARALLEL_TABS:
+                tabs = self.load_pages_in_tabs({
+                    "attendance": (ATTENDANCE_PAGE_URL, ATTENDANCE_TABLE_XPATH),
+                    "timetable": (TIMETABLE_URL, TIMETABLE_TABLE_XPATH)
+                })
+                html_source = tabs["attendance"]["html"]
+                timetable_html = tabs["timetable"]["html"]
+                # In-page extraction reads whichever tab is active
+                self.driver.switch_to.window(tabs["attendance"]["handle"])
+            else:
+                html_source = self.get_attendance_page()
 
-            # Continue with existing scraping logic...
+            # Phase 1: attendance and marks share the same page
+            started = time.time()
+            registration_number = (
+                self.page_registration_number(html_source) if html_source is not None else None
+            )
+            if not registration_number or not self.get_user_id(registration_number):
+                phase("attendance", "failed", started, "Could not load attendance page or identify user")
+                phase("marks", "skipped", started)
+            else:
+                result["attendance_success"] = self.parse_and_save_attendance(html_source, self.driver)
+                phase("attendance", "success" if result["attendance_success"] else "failed", started)
+                started = time.time()
+                result["marks_success"] = self.parse_and_save_marks(html_source, self.driver)
+                phase("marks", "success" if result["marks_success"] else "failed", started)
+            result["changes"] = dict(self.changes)
+
+            # Phase 2: timetable in the same logged-in driver
+            started = time.time()
+            if PARALLEL_TABS:
+                # Timetable retries and batch detection read the timetable tab
+                self.driver.switch_to.window(tabs["timetable"]["handle"])
+            course_data = self.scrape_timetable(timetable_html)
+            if not course_data:
+                phase("timetable", "failed", started, "Failed to scrape timetable data")
+            else:
+                auto_batch = self.parse_batch_number_from_page()
+                merged_result = self.merge_timetable_with_courses(course_data, auto_batch)
+                if merged_result["status"] != "success":
+                    phase("timetable", "failed", started, merged_result.get("msg"))
+                else:
+                    result["timetable_data"] = merged_result
+                    result["timetable_success"] = self.store_timetable_in_supabase(merged_result)
+                    phase("timetable", "success" if result["timetable_success"] else "failed", started)
+
+            succeeded = [result["attendance_success"], result["marks_success"], result["timetable_success"]]
+            if all(succeeded):
+                result["status"] = "success"
+                result["message"] = "All data scraped in a single session"
+            elif any(succeeded):
+                result["status"] = "partial"
+                result["message"] = "Some phases failed; see phases for details"
+            else:
+                result["message"] = "All scraping phases failed"
 
+            logger.info(f"Unified scraper finished with status {result['status']}")
             return result
         except Exception as e:
             logger.error(f"Error in unified scraper: {str(e)}")
             traceback.print_exc()
-            result["message"] = str(e)
+            result["message"] = self.failure_message(e)
+            self.release_driver(discard=True)
             return result
+        finally:
+            self.release_driver()
 
     def verify_token(self, token):
         """Verify a JWT token"""
@@ -1440,8 +2071,33 @@ class SRMScraper:
         except:
             return 0
 
+# SQL for the columns the scraper relies on beyond the original schema
+"""
+-- Run this SQL in your Supabase SQL editor:
+
+-- Session reuse: when the stored cookies were last confirmed valid
+ALTER TABLE user_cookies ADD COLUMN IF NOT EXISTS last_valid_at TIMESTAMP;
+
+-- Change detection: hash of the stored JSON, and when a scrape last confirmed it
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS checked_at TIMESTAMP;
+ALTER TABLE marks ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE marks ADD COLUMN IF NOT EXISTS checked_at TIMESTAMP;
+
+-- Timetable caching: the course registration a timetable was scraped for
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS registration_fingerprint TEXT;
+ALTER TABLE timetable ADD COLUMN IF NOT EXISTS registration_fingerprint TEXT;
+ALTER TABLE timetable ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+-- Background refresh: when the user last made an API request
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP;
+
+-- Forced refresh cooldown: when the user last forced a refresh
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_forced_refresh_at TIMESTAMP;
+"""
+
 # Public interface to match the original script
-def run_scraper(email, password, scraper_type="attendance"):
+def run_scraper(email, password, scraper_type="attendance", http_first=True):
     """
     Run the specified scraper with the provided credentials
 
@@ -1449,13 +2105,15 @@ def run_scraper(email, password, scraper_type="attendance"):
     - "attendance": Just run attendance scraper
     - "timetable": Just run timetable scraper
     - "unified": Run both scrapers in a single browser session (recommended for Render)
+
+    http_first=False skips the browserless attempt, for callers that just had it fail
     """
     scraper = SRMScraper(email, password)
 
     if scraper_type.lower() == "attendance":
-        return scraper.run_attendance_scraper()
+        return scraper.run_attendance_scraper(http_first=http_first)
     elif scraper_type.lower() == "timetable":
-        return scraper.run_timetable_scraper()
+        return scraper.run_timetable_scraper(http_first=http_first)
     elif scraper_type.lower() == "unified":
         return scraper.run_unified_scraper()
     else: